@@ -5,6 +5,7 @@ import pyperclip
 import json
 import re
 from response_1 import process_element_with_gpt
+from url_canonical import canonicalize_url
 from streamlit_option_menu import option_menu
 
 import re
@@ -16,6 +17,11 @@ class DataFormatter:
         """Format extracted text from containers into structured data."""
         if not text.strip():
             return {}
+        
+        # Structured output from fm_people_extraction.js needs no reparsing
+        structured_data = DataFormatter.format_structured_json(text)
+        if structured_data is not None:
+            return structured_data
             
         container_pattern = r"=== CONTAINER #(\d+) - Instance #(\d+) ==="
         sections = re.split(container_pattern, text)
@@ -50,6 +56,70 @@ class DataFormatter:
 
         return formatted_data
     
+    @staticmethod
+    def format_structured_json(text):
+        """Load the JSON / JSON Lines output of the browser script, or return None for plain text"""
+        stripped = text.strip()
+        if not stripped.startswith(('{', '[')):
+            return None
+        
+        try:
+            document = json.loads(stripped)
+            records = None
+        except ValueError:
+            # JSON Lines: one instance per line
+            try:
+                records = [json.loads(line) for line in stripped.splitlines() if line.strip()]
+            except ValueError:
+                return None
+            document = None
+        
+        if records is None:
+            if isinstance(document, dict) and isinstance(document.get('containers'), list):
+                containers = document['containers']
+                if not all(isinstance(container, dict) and isinstance(container.get('instances', []), list)
+                           and all(isinstance(instance, dict) for instance in container.get('instances', []))
+                           for container in containers):
+                    return None
+                records = [
+                    dict(instance, container=container.get('container', c_idx + 1))
+                    for c_idx, container in enumerate(containers)
+                    for instance in container.get('instances', [])
+                ]
+            elif isinstance(document, list):
+                records = document
+            else:
+                return None
+        
+        formatted_data = {}
+        for record in records:
+            if (not isinstance(record, dict) or 'container' not in record
+                    or not isinstance(record.get('links', []), list)):
+                return None
+            container_num = str(record['container'])
+            container = formatted_data.setdefault(container_num, {})
+            instance_num = str(record.get('instance', len(container) + 1))
+            container[instance_num] = DataFormatter._create_structured_instance(record)
+        
+        return formatted_data
+    
+    @staticmethod
+    def _create_structured_instance(record):
+        """Create instance data from a structured record, matching the text format's output"""
+        content_lines = [line.strip() for line in str(record.get('text', '')).split('\n') if line.strip()]
+        links = []
+        for link in record.get('links', []):
+            href = link.get('href', '') if isinstance(link, dict) else str(link)
+            if href.startswith(('http://', 'https://')):
+                href = canonicalize_url(href)
+            if href.startswith(('http://', 'https://')) and {'href': href} not in links:
+                links.append({'href': href})
+        
+        return {
+            'text': '\n'.join(content_lines),
+            'links': links
+        }
+    
     @staticmethod
     def _process_container_content(content, container_num, formatted_data):
         """Process individual container content"""
@@ -96,7 +166,7 @@ class DataFormatter:
         link_match = re.search(r'(?:Link \d+: )?(https?://[^\s]+)', line)
         if link_match:
             return {
-                'href': link_match.group(1)
+                'href': canonicalize_url(link_match.group(1))
             }
         return None
     
@@ -0,0 +1,199 @@
+import logging
+import threading
+import time
+from collections import Counter, deque
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Tuple
+
+import openai
+import requests
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Call outcomes fed back to a limiter
+OK = 'ok'
+OVERLOAD = 'overload'
+ERROR = 'error'
+
+# Statuses that mean the server wants less traffic
+OVERLOAD_STATUSES = {429, 500, 502, 503, 504}
+OVERLOAD_EXCEPTIONS = (requests.Timeout, requests.ConnectionError, openai.APIConnectionError,
+                       TimeoutError, ConnectionError)
+
+# Short- and long-term EWMA weights; the long-term average is the uncongested baseline
+LATENCY_SMOOTHING = 0.2
+BASELINE_SMOOTHING = 0.02
+HISTORY_SIZE = 500
+# Share of the limit in use when a call starts for its success to grow the limit
+SATURATION_THRESHOLD = 0.75
+
+
+def classify_exception(error: BaseException) -> str:
+    """Map a failed call to OVERLOAD (429, 5xx, timeouts, connection failures) or ERROR"""
+    status = getattr(error, 'status_code', None)
+    if status is None:
+        status = getattr(getattr(error, 'response', None), 'status_code', None)
+    if status in OVERLOAD_STATUSES or isinstance(error, OVERLOAD_EXCEPTIONS):
+        return OVERLOAD
+    return ERROR
+
+
+class AIMDLimiter:
+    """In-flight limit for one target with additive increase and multiplicative decrease.
+
+    Every successful call that started with the limit (nearly) used up grows it
+    by increase / limit, i.e. by `increase` per window of limit calls, so the
+    limit only rises while callers actually compete for slots. Overloads and a short-term latency average above
+    latency_tolerance times the long-term one cut it by `backoff`. Calls started
+    before the last cut do not cut it again, so one burst of failures counts once.
+    """
+
+    def __init__(self, initial_limit: int = 4, min_limit: int = 1, max_limit: int = 64, increase: float = 1.0,
+                 backoff: float = 0.5, latency_tolerance: float = 2.0):
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.increase = increase
+        self.backoff = backoff
+        self.latency_tolerance = latency_tolerance
+        self._limit = float(initial_limit)
+        self._in_flight = 0
+        self._condition = threading.Condition()
+        self._smoothed_latency: Optional[float] = None
+        self._baseline_latency: Optional[float] = None
+        self._samples_since_cut = 0
+        self._last_cut = float('-inf')
+        self._outcomes = Counter()
+        self._history = deque(maxlen=HISTORY_SIZE)
+        self._log('initial')
+
+    @property
+    def limit(self) -> int:
+        return max(self.min_limit, int(self._limit))
+
+    def _log(self, reason: str) -> None:
+        self._history.append((time.time(), self.limit, self._in_flight, reason))
+
+    def acquire(self) -> Tuple[float, bool]:
+        """Block until a slot is free and return the call's start time and whether the limit was saturated"""
+        with self._condition:
+            waited = False
+            while self._in_flight >= self.limit:
+                waited = True
+                self._condition.wait()
+            self._in_flight += 1
+            saturated = waited or self._in_flight >= self.limit * SATURATION_THRESHOLD
+            return time.monotonic(), saturated
+
+    def release(self, started: float, outcome: str, latency: float, saturated: bool = True) -> None:
+        """Free the slot and adjust the limit from the call's outcome and latency"""
+        with self._condition:
+            self._in_flight -= 1
+            self._outcomes[outcome] += 1
+            if outcome == OVERLOAD:
+                self._cut(started, outcome)
+            elif outcome == OK:
+                self._observe_latency(started, latency, saturated)
+            self._condition.notify_all()
+
+    def _observe_latency(self, started: float, latency: float, saturated: bool) -> None:
+        if self._smoothed_latency is None:
+            self._smoothed_latency = latency
+        else:
+            self._smoothed_latency += LATENCY_SMOOTHING * (latency - self._smoothed_latency)
+        if self._baseline_latency is None:
+            self._baseline_latency = latency
+        else:
+            self._baseline_latency += BASELINE_SMOOTHING * (latency - self._baseline_latency)
+        self._samples_since_cut += 1
+        # Below the limit, latency says nothing about our concurrency and there is no demand for more
+        if not saturated:
+            return
+
+        # Judge latency only after a full window of samples since the last cut
+        if (self._samples_since_cut >= self.limit
+                and self._smoothed_latency > self._baseline_latency * self.latency_tolerance):
+            self._cut(started, 'latency')
+            return
+
+        previous = self.limit
+        self._limit = min(float(self.max_limit), self._limit + self.increase / self._limit)
+        if self.limit != previous:
+            self._log('increase')
+
+    def _cut(self, started: float, reason: str) -> None:
+        if started < self._last_cut:
+            return
+        self._limit = max(float(self.min_limit), self._limit * self.backoff)
+        self._last_cut = time.monotonic()
+        self._samples_since_cut = 0
+        self._smoothed_latency = None
+        self._log(reason)
+        logger.debug(f"Concurrency limit cut to {self.limit} ({reason})")
+
+    def snapshot(self) -> dict:
+        """Current limit, in-flight count, latency estimates and outcome counts"""
+        with self._condition:
+            return {
+                'limit': self.limit,
+                'in_flight': self._in_flight,
+                'baseline_latency': self._baseline_latency,
+                'smoothed_latency': self._smoothed_latency,
+                'outcomes': dict(self._outcomes),
+            }
+
+    def history(self) -> List[tuple]:
+        """(timestamp, limit, in_flight, reason) for every change of the limit"""
+        with self._condition:
+            return list(self._history)
+
+
+class ConcurrencyController:
+    """AIMD limiters keyed by target, e.g. one per scraped host"""
+
+    def __init__(self, **limiter_kwargs):
+        self.limiter_kwargs = limiter_kwargs
+        self._limiters: Dict[str, AIMDLimiter] = {}
+        self._lock = threading.Lock()
+
+    def limiter(self, key: str) -> AIMDLimiter:
+        with self._lock:
+            if key not in self._limiters:
+                self._limiters[key] = AIMDLimiter(**self.limiter_kwargs)
+            return self._limiters[key]
+
+    @contextmanager
+    def track(self, key: str):
+        """Hold a slot for key while the block runs and feed its outcome back to the limiter"""
+        limiter = self.limiter(key)
+        started, saturated = limiter.acquire()
+        try:
+            yield
+        except BaseException as e:
+            limiter.release(started, classify_exception(e), time.monotonic() - started, saturated)
+            raise
+        limiter.release(started, OK, time.monotonic() - started, saturated)
+
+    def metrics(self) -> Dict[str, dict]:
+        with self._lock:
+            limiters = dict(self._limiters)
+        return {key: limiter.snapshot() for key, limiter in limiters.items()}
+
+    def history(self, key: str) -> List[tuple]:
+        with self._lock:
+            limiter = self._limiters.get(key)
+        return limiter.history() if limiter else []
+
+    def reset(self) -> None:
+        with self._lock:
+            self._limiters.clear()
+
+
+# Shared by make_request (keyed by host) and the response_1 calls (keyed by model)
+host_concurrency = ConcurrencyController(initial_limit=4, max_limit=64)
+llm_concurrency = ConcurrencyController(initial_limit=8, max_limit=64, latency_tolerance=3.0)
+
+
+def get_concurrency_metrics() -> Dict[str, Dict[str, dict]]:
+    """Current per-host and LLM limits, in-flight counts and outcome counts"""
+    return {'hosts': host_concurrency.metrics(), 'llm': llm_concurrency.metrics()}
@@ -8,6 +8,14 @@ from response_1 import process_element_with_gpt, process_element_with_gpt_2
 from DataFormatter import DataFormatter
 from UI import UI
 from helper_functions import make_request, is_valid_link, extract_data_from_url, merge_employee_data, format_additional_links, validate_employee_data, get_base_url, normalize_url, process_employee_data
+from result_store import ResultStore
+from exporters import export_to_tempfile
+from sitemap_discovery import fill_missing_profile_urls
+from pagination_crawler import crawl_paginated_team
+from instance_dedup import build_instance_index, map_deduplicated
+from container_ranking import rank_containers
+from adaptive_concurrency import get_concurrency_metrics
+from url_canonical import canonicalize_url
 import pandas as pd
 import streamlit as st
 from google.oauth2 import service_account
@@ -24,7 +32,6 @@ from googleapiclient.discovery import build
 load_dotenv()
 
 gcp_service_account = os.getenv("GCP_SERVICE_ACCOUNT")
-gcp_credentials = json.loads(gcp_service_account)
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -33,6 +40,8 @@ logger = logging.getLogger(__name__)
 # Constants
 APP_TITLE = "FM Data Extractor"
 DEFAULT_EXCEL_FILENAME = "employee_data_results.xlsx"
+DEFAULT_CSV_FILENAME = "employee_data_results.csv"
+RESULTS_PAGE_SIZE = 1000
 
 class SessionManager:
     """Improved session state manager with proper initialization and type hints"""
@@ -46,7 +55,10 @@ class SessionManager:
             'url': "",
             'text_area': "",
             'response_data': None,
-            'processing': False
+            'processing': False,
+            'result_store': None,
+            'llm_results_cache': {},
+            'exports': {}
         }
         
         for key, default_value in default_states.items():
@@ -62,6 +74,40 @@ class SessionManager:
         st.session_state.text_area = ""
         st.session_state.response_data = None
         st.session_state.processing = False
+        SessionManager.clear_exports()
+        if st.session_state.get('result_store') is not None:
+            st.session_state.result_store.close()
+            st.session_state.result_store = None
+        st.session_state.llm_results_cache = {}
+    
+    @staticmethod
+    def get_result_store() -> ResultStore:
+        """Return the session's on-disk result store, creating it on first use"""
+        if st.session_state.get('result_store') is None:
+            st.session_state.result_store = ResultStore()
+        return st.session_state.result_store
+    
+    @staticmethod
+    def get_exports() -> dict:
+        """Return the session's prepared export files keyed by format"""
+        if st.session_state.get('exports') is None:
+            st.session_state.exports = {}
+        return st.session_state.exports
+    
+    @staticmethod
+    def clear_exports():
+        """Delete prepared export files, e.g. once the results they were built from change"""
+        for export_path in SessionManager.get_exports().values():
+            if os.path.exists(export_path):
+                os.remove(export_path)
+        st.session_state.exports = {}
+    
+    @staticmethod
+    def get_llm_results_cache() -> dict:
+        """Return the session's cache of LLM results keyed by instance fingerprint"""
+        if st.session_state.get('llm_results_cache') is None:
+            st.session_state.llm_results_cache = {}
+        return st.session_state.llm_results_cache
     
     @staticmethod
     def update_formatted_data(data: dict):
@@ -149,12 +195,13 @@ def handle_data_processing(url: str, formatted_data: dict):
         SessionManager.set_processing(False)
 
 
-def process_individual_urls(preview_results: dict) -> dict:
+def process_individual_urls(preview_results: dict, store: ResultStore, firm_url: str = "") -> int:
+    """Enrich each employee from their profile page and stage the rows in the result store"""
     if not validate_employee_data(preview_results):
         st.error("Invalid data format received from initial processing")
-        return {"employees": []}
+        return 0
         
-    updated_results = {"employees": []}
+    appended = 0
     total_urls = len(preview_results['employees'])
     
     progress_bar = st.progress(0)
@@ -177,18 +224,20 @@ def process_individual_urls(preview_results: dict) -> dict:
                 individual_url = employee.get('Individual profile URLs', '')
                 if not individual_url:
                     logger.warning(f"No URL found for employee {i+1}")
-                    updated_results['employees'].append(employee)
+                    store.append(employee, firm_url)
+                    appended += 1
                     continue
                 
                 main_url = employee.get('Main_URL', '')
-                base_url = get_base_url(main_url) if main_url else get_base_url(individual_url)
-                individual_url = normalize_url(individual_url, base_url)
+                individual_url = canonicalize_url(individual_url, main_url or individual_url,
+                                                  resolve_relative=False)
                 employee['Individual profile URLs'] = individual_url
                 employee_name = employee['Name']
                 scraped_content = extract_data_from_url(individual_url, employee_name)
                 if not scraped_content:
                     logger.warning(f"No content extracted from URL: {individual_url}")
-                    updated_results['employees'].append(employee)
+                    store.append(employee, firm_url)
+                    appended += 1
                     continue
                 
                 individual_result = process_element_with_gpt_2(scraped_content, individual_url)
@@ -196,14 +245,16 @@ def process_individual_urls(preview_results: dict) -> dict:
                 if validate_employee_data(individual_result) and individual_result['employees']:
                     processed_employee = process_employee_data(individual_result['employees'][0])
                     merged_data = merge_employee_data(employee, processed_employee)
-                    updated_results['employees'].append(merged_data)
+                    store.append(merged_data, firm_url)
                 else:
                     logger.warning(f"Invalid GPT response for URL: {individual_url}")
-                    updated_results['employees'].append(employee)
+                    store.append(employee, firm_url)
+                appended += 1
                     
             except Exception as e:
                 logger.error(f"Error processing employee {i+1}: {str(e)}")
-                updated_results['employees'].append(employee)
+                store.append(employee, firm_url)
+                appended += 1
                 
     except Exception as e:
         logger.error(f"Error in main processing loop: {str(e)}")
@@ -211,7 +262,7 @@ def process_individual_urls(preview_results: dict) -> dict:
         progress_bar.empty()
         status_container.empty()
     
-    return updated_results
+    return appended
 
 
 def get_google_sheets_service():
@@ -219,6 +270,8 @@ def get_google_sheets_service():
     try:
         # Load credentials from environment variable
         if gcp_service_account:
+            # Parsed here so the app's functions can be imported without credentials
+            gcp_credentials = json.loads(gcp_service_account)
             # Create temporary credentials file
             with open('temp_credentials.json', 'w') as f:
                 json.dump(gcp_credentials, f)
@@ -262,19 +315,74 @@ def find_first_empty_row(sheet, spreadsheet_id):
         return 1
 
 
-def display_results(df: pd.DataFrame, spreadsheet_id='13Z3SomiihUpaikt4HFbDnLsoEel-IQmhjxK22EQqJ4k'):
-    """Display and append results to Google Sheet with improved error handling"""
-    if df.empty:
+def display_result_page(store: ResultStore, firm_url: str = None):
+    """Display one page of stored results without loading the full table"""
+    total_rows = store.count(firm_url=firm_url)
+    total_pages = max(1, -(-total_rows // RESULTS_PAGE_SIZE))
+    page_number = 1
+    if total_pages > 1:
+        page_number = st.number_input("Page", min_value=1, max_value=total_pages, value=1, step=1, key="results_page")
+    
+    rows = store.page(offset=(page_number - 1) * RESULTS_PAGE_SIZE, limit=RESULTS_PAGE_SIZE, firm_url=firm_url)
+    page_df = pd.DataFrame(rows, columns=store.columns())
+    page_df = page_df.replace({np.nan: '', None: ''}).astype(str)
+    st.dataframe(page_df, use_container_width=True, height=300)
+    st.caption(f"Showing page {page_number} of {total_pages} ({total_rows} rows)")
+
+
+def display_downloads(store: ResultStore, firm_url: str = None):
+    """Build an XLSX or CSV export of the stored results on request and offer it for download"""
+    exports = SessionManager.get_exports()
+    col1, col2 = st.columns([1, 1])
+    for column, file_format, file_name, mime in (
+        (col1, 'xlsx', DEFAULT_EXCEL_FILENAME, "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"),
+        (col2, 'csv', DEFAULT_CSV_FILENAME, "text/csv"),
+    ):
+        try:
+            if file_format not in exports:
+                if column.button(f"Prepare {file_format.upper()}", key=f"prepare_{file_format}"):
+                    exports[file_format] = export_to_tempfile(store, file_format, firm_url=firm_url)
+            if file_format in exports:
+                with open(exports[file_format], 'rb') as f:
+                    column.download_button(f"Download {file_format.upper()}", data=f, file_name=file_name,
+                                           mime=mime, key=f"download_{file_format}")
+        except Exception as e:
+            st.error(f"Error exporting {file_format.upper()}: {str(e)}")
+
+
+def display_concurrency_metrics():
+    """Show the adaptive in-flight limits per scraped host and for the LLM"""
+    rows = []
+    for kind, limits in get_concurrency_metrics().items():
+        for target, snapshot in limits.items():
+            rows.append({
+                'kind': kind,
+                'target': target,
+                'limit': snapshot['limit'],
+                'in flight': snapshot['in_flight'],
+                'latency ms': round(1000 * snapshot['smoothed_latency']) if snapshot['smoothed_latency'] else '',
+                'baseline ms': round(1000 * snapshot['baseline_latency']) if snapshot['baseline_latency'] else '',
+                **snapshot['outcomes'],
+            })
+    if rows:
+        with st.expander("Concurrency limits", expanded=False):
+            st.dataframe(pd.DataFrame(rows).fillna(0), use_container_width=True)
+
+
+def display_results(store: ResultStore, firm_url: str = None):
+    """Display the stored results with their downloads; drawn on every rerun so its widgets keep working"""
+    if not store.count(firm_url=firm_url):
         st.warning("No data available to display")
         return
     
-    # Clean and process the DataFrame
-    df = df.copy()
-    df = df.replace({np.nan: '', None: ''})
-    df = df.astype(str)
-    
-    # Display current data
-    st.dataframe(df, use_container_width=True, height=300)
+    display_result_page(store, firm_url)
+    display_downloads(store, firm_url)
+
+
+def append_results_to_sheet(store: ResultStore, firm_url: str = None, spreadsheet_id='13Z3SomiihUpaikt4HFbDnLsoEel-IQmhjxK22EQqJ4k'):
+    """Append the stored results to Google Sheet with improved error handling"""
+    if not store.count(firm_url=firm_url):
+        return
     
     try:
         service = get_google_sheets_service()
@@ -300,35 +408,35 @@ def display_results(df: pd.DataFrame, spreadsheet_id='13Z3SomiihUpaikt4HFbDnLsoE
         
         # Find the first empty row
         first_empty_row = find_first_empty_row(sheet, spreadsheet_id)
+        columns = store.columns()
         
         # If it's the first row, include headers
-        values = [df.columns.tolist()] if first_empty_row == 1 else []
-        values.extend(df.values.tolist())
+        start_row = first_empty_row
+        if first_empty_row == 1:
+            sheet.values().update(
+                spreadsheetId=spreadsheet_id,
+                range=f'Sheet1!A{start_row}',
+                valueInputOption='RAW',
+                body={'values': [columns]}
+            ).execute()
+            start_row += 1
         
-        # Proceed with writing data
-        if values:
-            # Update in batches to handle large datasets
-            batch_size = 1000
-            for i in range(0, len(values), batch_size):
-                batch = values[i:i + batch_size]
-                
-                # Calculate the starting row for this batch
-                start_row = first_empty_row + i
-                
-                body = {
-                    'values': batch
-                }
-                
-                range_name = f'Sheet1!A{start_row}'
-                
-                sheet.values().update(
-                    spreadsheetId=spreadsheet_id,
-                    range=range_name,
-                    valueInputOption='RAW',
-                    body=body
-                ).execute()
+        # Stream batches straight from the store to handle large datasets
+        written = 0
+        for batch in store.iter_values(columns, page_size=RESULTS_PAGE_SIZE, firm_url=firm_url):
+            range_name = f'Sheet1!A{start_row}'
             
-            st.success(f"Successfully appended {len(df)} rows to Google Sheet starting from row {first_empty_row}")
+            sheet.values().update(
+                spreadsheetId=spreadsheet_id,
+                range=range_name,
+                valueInputOption='RAW',
+                body={'values': batch}
+            ).execute()
+            
+            start_row += len(batch)
+            written += len(batch)
+        
+        st.success(f"Successfully appended {written} rows to Google Sheet starting from row {first_empty_row}")
         
     except Exception as e:
         st.error(f"Error accessing Google Sheets: {str(e)}")
@@ -369,37 +477,58 @@ def main():
                 base_url = get_base_url(url) if url else ""
                 
                 
-                SessionManager.update_formatted_data(formatted_data['1'])
+                ranking = rank_containers(formatted_data)
+                scores = {entry['container']: entry for entry in ranking}
+                best_key = ranking[0]['container'] if ranking else '1'
+                
+                SessionManager.update_formatted_data(formatted_data.get(best_key, {}))
                 st.markdown("##### Preview")
-                if '1' in formatted_data:
-                    with st.expander("Container 1", expanded=True):
-                        st.code(UI.get_preview_text(formatted_data['1']), language="text")
-                if '2' in formatted_data:
-                    with st.expander("Container 2", expanded=False):
-                        st.code(UI.get_preview_text(formatted_data['2']), language="text")
-                if '3' in formatted_data:
-                    with st.expander("Container 3", expanded=False):
-                        st.code(UI.get_preview_text(formatted_data['3']), language="text")
-                if '4' in formatted_data:
-                    with st.expander("Container 4", expanded=False):
-                        st.code(UI.get_preview_text(formatted_data['4']), language="text")
-                if '5' in formatted_data:
-                    with st.expander("Container 5", expanded=False):
-                        st.code(UI.get_preview_text(formatted_data['5']), language="text")
+                container_keys = sorted(formatted_data, key=lambda key: int(key) if key.isdigit() else 0)
+                for key in container_keys:
+                    label = f"Container {key} (score {scores[key]['score']}, {scores[key]['instances']} instances)"
+                    if key == best_key:
+                        label += " - recommended"
+                    with st.expander(label, expanded=(key == best_key)):
+                        st.code(UI.get_preview_text(formatted_data[key]), language="text")
+                
+                with st.expander("Container scores", expanded=False):
+                    st.dataframe(pd.DataFrame(ranking).set_index('container'), use_container_width=True)
 
                 selected_container = st.selectbox(
                             "Choose a container to Generate Response:",
-                            options=["Container 1", "Container 2", "Container 3", "Container 4", "Container 5"]
+                            options=[f"Container {key}" for key in container_keys],
+                            index=container_keys.index(best_key) if best_key in container_keys else 0
                         )
-                formatted_data = formatted_data[selected_container[-1:]]
+                all_formatted_data = formatted_data
+                container_key = selected_container.split()[-1]
+                formatted_data = formatted_data[container_key]
                 print("Formatted Data", formatted_data)
+                crawl_pages = st.checkbox("Include the team page's other pages (pagination / load more)", value=False)
                 if url and st.button("Generate Response", type="primary", disabled=SessionManager.is_processing()):
                     try:
+                        if crawl_pages:
+                            with st.spinner("Crawling additional team pages..."):
+                                captured = len(formatted_data)
+                                formatted_data = crawl_paginated_team(url, formatted_data)
+                                st.info(f"Found {len(formatted_data) - captured} more people on additional pages")
+                        
                         with st.spinner("Processing initial data..."):
                             initial_results = {'employees': []}
-                            for data in formatted_data.values():
+                            # Send each unique person card once, even if it repeats across containers
+                            index = build_instance_index({**all_formatted_data, container_key: formatted_data})
+                            keys = [(container_key, instance_num) for instance_num in formatted_data]
+                            instance_results = map_deduplicated(
+                                keys, index, lambda data: process_element_with_gpt(data, url),
+                                cache=SessionManager.get_llm_results_cache(), url=url
+                            )
+                            representatives = index.representatives(keys)
+                            seen_representatives = set()
+                            for key in keys:
+                                if representatives[key] in seen_representatives:
+                                    continue
+                                seen_representatives.add(representatives[key])
                                 # Process each employee data for consistent types
-                                employee_results = process_element_with_gpt(data, url)['employees']
+                                employee_results = (instance_results[key] or {}).get('employees', [])
                                 initial_results['employees'].extend([
                                     process_employee_data(emp) for emp in employee_results
                                 ])
@@ -412,16 +541,22 @@ def main():
                                 ])
                                 st.dataframe(initial_df, use_container_width=True, height=200)
                                 
+                                with st.spinner("Looking up missing profile URLs in sitemaps..."):
+                                    resolved = fill_missing_profile_urls(initial_results['employees'], url)
+                                    if resolved:
+                                        st.info(f"Found {resolved} missing profile URLs in the site's sitemaps")
+                                
                                 with st.spinner("Processing individual profiles..."):
-                                    updated_results = process_individual_urls(initial_results)
+                                    store = SessionManager.get_result_store()
+                                    # Show and upload only this run's rows for the firm
+                                    store.clear(firm_url=url)
+                                    SessionManager.clear_exports()
+                                    SessionManager.update_response_data(None)
+                                    appended = process_individual_urls(initial_results, store, firm_url=url)
                                     
-                                    if validate_employee_data(updated_results):
-                                        st.subheader("Final Results")
-                                        final_df = pd.DataFrame([
-                                            process_employee_data(emp) for emp in updated_results['employees']
-                                        ])
-                                        display_results(final_df)
-                                        SessionManager.update_response_data(updated_results)
+                                    if appended:
+                                        append_results_to_sheet(store, firm_url=url)
+                                        SessionManager.update_response_data({'result_store': store.path, 'firm_url': url})
                                     else:
                                         st.error("Error processing individual profiles")
                             else:
@@ -431,6 +566,14 @@ def main():
                         st.error(f"Error during processing: {str(e)}")
                         logger.error(f"Processing error: {str(e)}")
                 
+                # Outside the button branch, so paging and downloads survive the reruns they trigger
+                response_data = st.session_state.get('response_data')
+                store = st.session_state.get('result_store')
+                if isinstance(response_data, dict) and 'firm_url' in response_data and store is not None:
+                    st.subheader("Final Results")
+                    display_results(store, firm_url=response_data['firm_url'])
+                    display_concurrency_metrics()
+                
             except Exception as e:
                 st.error(f"Error formatting data: {str(e)}")
                 logger.error(f"Formatting error: {str(e)}")
@@ -0,0 +1,363 @@
+import argparse
+import json
+import logging
+import os
+import shutil
+import time
+import uuid
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterable, List, Optional
+
+from container_ranking import rank_containers
+from DataFormatter import DataFormatter
+from helper_functions import extract_data_from_url, merge_employee_data, process_employee_data, validate_employee_data
+from response_1 import (LISTING_SYSTEM_PROMPT, MODEL, PROFILE_SYSTEM_PROMPT, build_messages, format_url,
+                        normalize_profile_result, setup_openai)
+from result_store import ResultStore
+from url_canonical import canonicalize_url
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+BATCH_ENDPOINT = "/v1/chat/completions"
+COMPLETION_WINDOW = "24h"
+POLL_INTERVAL = 60
+POLL_TIMEOUT = 26 * 60 * 60
+SCRAPE_WORKERS = 8
+DONE_STATUSES = {'completed', 'failed', 'expired', 'cancelled'}
+# Final statuses whose output file holds the requests finished before the batch stopped
+PARTIAL_STATUSES = {'expired', 'cancelled'}
+
+
+def build_batch_request(custom_id: str, element_data, url: str, system_prompt: str = PROFILE_SYSTEM_PROMPT) -> dict:
+    """One line of a batch request file, for the single-profile prompt by default"""
+    return {
+        "custom_id": custom_id,
+        "method": "POST",
+        "url": BATCH_ENDPOINT,
+        "body": {
+            "model": MODEL,
+            "messages": build_messages(system_prompt, element_data, url),
+            "response_format": {"type": "json_object"}
+        }
+    }
+
+
+def write_batch_file(requests: Iterable[dict], path: str) -> int:
+    """Stream batch requests to a JSONL file, returning how many were written"""
+    written = 0
+    with open(path, 'w', encoding='utf-8') as f:
+        for request in requests:
+            f.write(json.dumps(request, ensure_ascii=False, separators=(',', ':')))
+            f.write('\n')
+            written += 1
+    return written
+
+
+def normalize_listing_result(result: dict) -> dict:
+    """Make the 'employees' of a listing response a list of dicts"""
+    employees = result['employees']
+    if isinstance(employees, dict):
+        employees = [employees]
+    result['employees'] = [dict(employee) for employee in employees if isinstance(employee, dict)]
+    return result
+
+
+def parse_batch_results(path: str, normalize: Callable[[dict], dict] = normalize_profile_result
+                        ) -> Dict[str, Optional[dict]]:
+    """Read a batch output file into custom_id -> normalized result (None on failure)"""
+    results = {}
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            custom_id = record.get('custom_id')
+            try:
+                response = record.get('response') or {}
+                if record.get('error') or response.get('status_code') != 200:
+                    raise ValueError(record.get('error') or f"status {response.get('status_code')}")
+                content = response['body']['choices'][0]['message']['content']
+                results[custom_id] = normalize(json.loads(content))
+            except Exception as e:
+                logger.error(f"Batch request {custom_id} failed: {e}")
+                results[custom_id] = None
+    return results
+
+
+class BatchBackend(ABC):
+    """Submits a batch request file and fetches its output file"""
+
+    @abstractmethod
+    def submit(self, input_path: str) -> str:
+        """Upload the request file and start a batch, returning its ID"""
+
+    @abstractmethod
+    def status(self, batch_id: str) -> str:
+        """Current Batch API status, e.g. 'in_progress' or 'completed'"""
+
+    @abstractmethod
+    def download_results(self, batch_id: str, output_path: str) -> None:
+        """Write whatever output and error records the batch has to output_path"""
+
+
+class OpenAIBatchBackend(BatchBackend):
+    """Batch API backend using the OpenAI client"""
+
+    def __init__(self, client=None):
+        self.client = client or setup_openai()
+
+    def submit(self, input_path: str) -> str:
+        with open(input_path, 'rb') as f:
+            batch_file = self.client.files.create(file=f, purpose="batch")
+        batch = self.client.batches.create(
+            input_file_id=batch_file.id,
+            endpoint=BATCH_ENDPOINT,
+            completion_window=COMPLETION_WINDOW
+        )
+        return batch.id
+
+    def status(self, batch_id: str) -> str:
+        return self.client.batches.retrieve(batch_id).status
+
+    def download_results(self, batch_id: str, output_path: str) -> None:
+        batch = self.client.batches.retrieve(batch_id)
+        with open(output_path, 'wb') as f:
+            for file_id in (batch.output_file_id, batch.error_file_id):
+                if file_id:
+                    f.write(self.client.files.content(file_id).read())
+
+
+def empty_profile_responder(body: dict) -> str:
+    """Offline stand-in for the model: echoes Main_URL and leaves every other field empty"""
+    user_message = body['messages'][-1]['content']
+    main_url = user_message.split('\n', 1)[0].replace('Main_URL:', '').strip()
+    return json.dumps({"employees": {"Main_URL": main_url}})
+
+
+class LocalFileBatchBackend(BatchBackend):
+    """Offline backend that answers batch files from a local responder, in the Batch API file formats"""
+
+    def __init__(self, work_dir: str, responder: Callable[[dict], str] = empty_profile_responder):
+        self.work_dir = work_dir
+        self.responder = responder
+        os.makedirs(work_dir, exist_ok=True)
+
+    def _batch_dir(self, batch_id: str) -> str:
+        return os.path.join(self.work_dir, batch_id)
+
+    def submit(self, input_path: str) -> str:
+        batch_id = f"batch_local_{uuid.uuid4().hex[:12]}"
+        os.makedirs(self._batch_dir(batch_id))
+        shutil.copyfile(input_path, os.path.join(self._batch_dir(batch_id), 'input.jsonl'))
+        return batch_id
+
+    def status(self, batch_id: str) -> str:
+        output_path = os.path.join(self._batch_dir(batch_id), 'output.jsonl')
+        if not os.path.exists(output_path):
+            self._run(batch_id, output_path)
+        return 'completed'
+
+    def _run(self, batch_id: str, output_path: str) -> None:
+        with open(os.path.join(self._batch_dir(batch_id), 'input.jsonl'), encoding='utf-8') as src, \
+                open(output_path, 'w', encoding='utf-8') as dst:
+            for i, line in enumerate(src):
+                if not line.strip():
+                    continue
+                request = json.loads(line)
+                record = {"id": f"{batch_id}_req_{i}", "custom_id": request['custom_id'], "response": None, "error": None}
+                try:
+                    content = self.responder(request['body'])
+                    record["response"] = {
+                        "status_code": 200,
+                        "body": {"model": request['body'].get('model'),
+                                 "choices": [{"index": 0, "message": {"role": "assistant", "content": content}}]}
+                    }
+                except Exception as e:
+                    record["error"] = {"code": "responder_error", "message": str(e)}
+                dst.write(json.dumps(record) + '\n')
+
+    def download_results(self, batch_id: str, output_path: str) -> None:
+        shutil.copyfile(os.path.join(self._batch_dir(batch_id), 'output.jsonl'), output_path)
+
+
+def wait_for_batch(backend: BatchBackend, batch_id: str, poll_interval: float = POLL_INTERVAL,
+                   timeout: float = POLL_TIMEOUT) -> str:
+    """Poll until the batch reaches a final status"""
+    deadline = time.monotonic() + timeout
+    while True:
+        status = backend.status(batch_id)
+        if status in DONE_STATUSES:
+            return status
+        if time.monotonic() >= deadline:
+            raise TimeoutError(f"Batch {batch_id} still '{status}' after {timeout} seconds")
+        logger.info(f"Batch {batch_id} is {status}, checking again in {poll_interval}s")
+        time.sleep(poll_interval)
+
+
+def run_batch(requests: Iterable[dict], backend: BatchBackend, work_dir: str, name: str,
+              poll_interval: float = POLL_INTERVAL, timeout: float = POLL_TIMEOUT) -> Optional[str]:
+    """Write, submit and wait for one batch, returning the path of its downloaded output file.
+
+    Returns None when there was nothing to submit or the batch produced no usable output.
+    """
+    input_path = os.path.join(work_dir, f'{name}_input.jsonl')
+    submitted = write_batch_file(requests, input_path)
+    if not submitted:
+        return None
+
+    batch_id = backend.submit(input_path)
+    logger.info(f"Submitted batch {batch_id} with {submitted} requests")
+    status = wait_for_batch(backend, batch_id, poll_interval, timeout)
+    if status in PARTIAL_STATUSES:
+        logger.warning(f"Batch {batch_id} ended with status '{status}', merging its partial output")
+    elif status != 'completed':
+        logger.error(f"Batch {batch_id} ended with status '{status}'")
+        return None
+
+    output_path = os.path.join(work_dir, f'{batch_id}_output.jsonl')
+    backend.download_results(batch_id, output_path)
+    return output_path
+
+
+def load_containers(path: str) -> Dict[str, Dict[str, dict]]:
+    """Parse a pasted containers dump, as text or the browser script's JSON, into DataFormatter's format"""
+    with open(path, encoding='utf-8') as f:
+        return DataFormatter.format_extracted_text(f.read())
+
+
+def select_container(formatted_data: Dict[str, Dict[str, dict]]) -> Optional[str]:
+    """Pick the container the app would recommend, logging every container's score"""
+    ranking = rank_containers(formatted_data)
+    for scores in ranking:
+        logger.info(f"Container {scores['container']}: score {scores['score']}, {scores['instances']} instances")
+    if not ranking:
+        return None
+    logger.info(f"Selected container {ranking[0]['container']}")
+    return ranking[0]['container']
+
+
+def extract_listing(container: Dict[str, dict], firm_url: str, backend: BatchBackend, work_dir: str,
+                    poll_interval: float = POLL_INTERVAL, timeout: float = POLL_TIMEOUT) -> List[dict]:
+    """Turn a container's person cards into employees through one batch job, like Generate Response does"""
+    os.makedirs(work_dir, exist_ok=True)
+    requests = (
+        build_batch_request(f"card-{instance_num}", instance, format_url(firm_url), LISTING_SYSTEM_PROMPT)
+        for instance_num, instance in container.items()
+    )
+    output_path = run_batch(requests, backend, work_dir, 'listing', poll_interval, timeout)
+    if not output_path:
+        return []
+
+    results = parse_batch_results(output_path, normalize_listing_result)
+    employees = []
+    for instance_num in container:
+        result = results.get(f"card-{instance_num}")
+        if result and validate_employee_data(result):
+            employees.extend(dict(process_employee_data(employee), Main_URL=employee.get('Main_URL') or firm_url)
+                             for employee in result['employees'])
+    logger.info(f"Extracted {len(employees)} employees from {len(container)} cards")
+    return employees
+
+
+def _prepare_employee(employee: dict) -> dict:
+    employee = process_employee_data(employee)
+    individual_url = employee.get('Individual profile URLs', '')
+    if individual_url:
+        main_url = employee.get('Main_URL', '')
+        employee['Individual profile URLs'] = canonicalize_url(individual_url, main_url or individual_url,
+                                                                 resolve_relative=False)
+    return employee
+
+
+def run_bulk_enrichment(employees: List[dict], backend: BatchBackend, work_dir: str,
+                        poll_interval: float = POLL_INTERVAL, timeout: float = POLL_TIMEOUT) -> List[dict]:
+    """Scrape every profile, enrich them all through one batch job and merge results back by custom ID"""
+    os.makedirs(work_dir, exist_ok=True)
+    employees = [_prepare_employee(employee) for employee in employees if isinstance(employee, dict)]
+
+    def scrape(indexed):
+        i, employee = indexed
+        url = employee.get('Individual profile URLs', '')
+        if not url or not employee.get('Name'):
+            return i, None
+        return i, extract_data_from_url(url, employee['Name'])
+
+    with ThreadPoolExecutor(max_workers=SCRAPE_WORKERS) as executor:
+        scraped = dict(executor.map(scrape, enumerate(employees)))
+
+    requests = (
+        build_batch_request(f"employee-{i}", content, format_url(employees[i]['Individual profile URLs']))
+        for i, content in scraped.items() if content
+    )
+    output_path = run_batch(requests, backend, work_dir, 'batch', poll_interval, timeout)
+    if not output_path:
+        logger.warning("No enriched profiles to merge")
+        return employees
+    results = parse_batch_results(output_path)
+
+    merged = []
+    for i, employee in enumerate(employees):
+        result = results.get(f"employee-{i}")
+        if result and validate_employee_data(result) and result['employees']:
+            merged.append(merge_employee_data(employee, process_employee_data(result['employees'][0])))
+        else:
+            merged.append(employee)
+    logger.info(f"Merged {sum(1 for r in results.values() if r)} of {len(employees)} employees")
+    return merged
+
+
+def main():
+    """Command line entry point for overnight bulk enrichment"""
+    parser = argparse.ArgumentParser(description="Enrich employee profiles through a batch LLM job")
+    parser.add_argument("input", help="JSON file with an 'employees' list, e.g. saved initial results, "
+                                      "or with --containers a pasted containers dump")
+    parser.add_argument("--containers", action="store_true",
+                        help="Treat input as the browser script's containers dump (text or JSON) and extract "
+                             "employees from the best ranked container first; needs --firm")
+    parser.add_argument("--backend", choices=("openai", "local"), default="openai")
+    parser.add_argument("--work-dir", default="batch_runs", help="Directory for batch request and output files")
+    parser.add_argument("--store", help="SQLite result store to append the enriched rows to "
+                                        "(default: results.sqlite3 in the work directory)")
+    parser.add_argument("--firm", default="", help="Firm URL recorded with the rows in the store")
+    parser.add_argument("--output", help="Also export the rows to this .xlsx or .csv file")
+    parser.add_argument("--poll-interval", type=float, default=POLL_INTERVAL)
+    args = parser.parse_args()
+
+    if args.backend == "local":
+        backend = LocalFileBatchBackend(os.path.join(args.work_dir, 'local_backend'))
+    else:
+        backend = OpenAIBatchBackend()
+
+    if args.containers:
+        if not args.firm:
+            raise SystemExit("--containers needs --firm, the team page URL the containers were captured from")
+        formatted_data = load_containers(args.input)
+        container_key = select_container(formatted_data)
+        if container_key is None:
+            raise SystemExit("No containers found in the input file")
+        employees = extract_listing(formatted_data[container_key], args.firm, backend, args.work_dir,
+                                    poll_interval=args.poll_interval)
+    else:
+        with open(args.input, encoding='utf-8') as f:
+            data = json.load(f)
+        if not validate_employee_data(data):
+            raise SystemExit("Input file must contain an 'employees' list")
+        employees = data['employees']
+    enriched = run_bulk_enrichment(employees, backend, args.work_dir, poll_interval=args.poll_interval)
+
+    # Always a named file: a temporary store would delete the overnight run's rows on close
+    store = ResultStore(args.store or os.path.join(args.work_dir, 'results.sqlite3'))
+    try:
+        store.append_many(enriched, args.firm)
+        logger.info(f"Stored {len(enriched)} rows in {store.path}")
+        if args.output:
+            from exporters import export_store
+            export_store(store, args.output, firm_url=args.firm)
+    finally:
+        store.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+"""Drive make_request or the response_1 LLM calls against a simulated server whose capacity shifts.
+
+The server serves `capacity` calls at the base latency and slows down
+proportionally beyond that. Past queue_factor times capacity it answers 503
+(HTTP) or 429 (LLM) straight away. Each run compares the adaptive limiter with
+fixed limits and reports, per capacity phase, the limit in force, goodput,
+overload rate and latency.
+
+    python benchmarks/bench_adaptive_concurrency.py [--target http|llm] [--phase-seconds 4]
+"""
+import argparse
+import os
+import statistics
+import sys
+import threading
+import time
+from collections import Counter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import adaptive_concurrency
+import helper_functions
+import response_1
+from adaptive_concurrency import ConcurrencyController
+from record_replay import InjectedAPIError, ReplayResponse, make_chat_client, make_chat_response
+
+PHASE_CAPACITIES = (8, 2, 24, 6)
+CLIENT_THREADS = 64
+QUEUE_FACTOR = 2.0
+BASE_LATENCY = {'http': 0.02, 'llm': 0.1}
+FIXED_LIMITS = (4, 32)
+SAMPLE_INTERVAL = 0.05
+URL = "https://small-firm.example/team"
+
+
+class SimulatedServer:
+    """Processor-sharing server with a capacity schedule and a bounded queue"""
+
+    def __init__(self, capacities, phase_seconds, base_latency):
+        self.capacities = capacities
+        self.phase_seconds = phase_seconds
+        self.base_latency = base_latency
+        self.started = time.monotonic()
+        self._in_flight = 0
+        self._lock = threading.Lock()
+
+    def phase(self) -> int:
+        return min(len(self.capacities) - 1, int((time.monotonic() - self.started) / self.phase_seconds))
+
+    def handle(self) -> bool:
+        """Serve one call, returning False when it was rejected as overloaded"""
+        with self._lock:
+            self._in_flight += 1
+            in_flight = self._in_flight
+        try:
+            capacity = self.capacities[self.phase()]
+            if in_flight > capacity * QUEUE_FACTOR:
+                time.sleep(self.base_latency * 0.2)
+                return False
+            time.sleep(self.base_latency * max(1.0, in_flight / capacity))
+            return True
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+
+
+def install_server(target, server):
+    if target == 'http':
+        def get(url, **kwargs):
+            if server.handle():
+                return ReplayResponse(url, 200, {'Content-Type': 'text/html'}, b'<html><body>ok</body></html>')
+            return ReplayResponse(url, 503, {}, b'')
+        helper_functions.set_http_transport(get)
+        return lambda: helper_functions.make_request(URL) is not None
+
+    def create(**kwargs):
+        if server.handle():
+            return make_chat_response('{"employees": {"Name": "Test Person"}}')
+        raise InjectedAPIError("Simulated rate limit", 429)
+    client = make_chat_client(create)
+    response_1.set_openai_client_factory(lambda: client)
+    return lambda: response_1.process_element_with_gpt_2([{"text": "Test Person"}], URL) is not None
+
+
+def run(target, controller, phase_seconds):
+    """Run the load, returning per-phase stats and the limiter history"""
+    # make_request and response_1 look the controller up at call time
+    helper_functions.host_concurrency = controller
+    response_1.llm_concurrency = controller
+    key = 'small-firm.example' if target == 'http' else response_1.MODEL
+
+    server = SimulatedServer(PHASE_CAPACITIES, phase_seconds, BASE_LATENCY[target])
+    call = install_server(target, server)
+    end = server.started + phase_seconds * len(PHASE_CAPACITIES)
+    phases = [{'ok': 0, 'failed': 0, 'latencies': [], 'limits': []} for _ in PHASE_CAPACITIES]
+    lock = threading.Lock()
+
+    def worker():
+        while time.monotonic() < end:
+            start = time.monotonic()
+            ok = call()
+            with lock:
+                phase = phases[server.phase()]
+                phase['ok' if ok else 'failed'] += 1
+                if ok:
+                    phase['latencies'].append(time.monotonic() - start)
+
+    def monitor():
+        while time.monotonic() < end:
+            limit = controller.limiter(key).snapshot()['limit']
+            phases[server.phase()]['limits'].append(limit)
+            time.sleep(SAMPLE_INTERVAL)
+
+    threads = [threading.Thread(target=worker) for _ in range(CLIENT_THREADS)] + [threading.Thread(target=monitor)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return phases, controller.history(key)
+
+
+def report(label, phases, phase_seconds):
+    print(f"\n{label}")
+    # Latencies include time spent waiting for a slot
+    print(f"{'phase':<7}{'capacity':>9}{'limit':>8}{'ok/s':>8}{'overload':>10}{'p50 ms':>9}{'p95 ms':>9}")
+    for number, (capacity, phase) in enumerate(zip(PHASE_CAPACITIES, phases), 1):
+        calls = phase['ok'] + phase['failed']
+        latencies = sorted(phase['latencies']) or [0.0]
+        print(f"{number:<7}{capacity:>9}{statistics.fmean(phase['limits'] or [0]):>8.1f}"
+              f"{phase['ok'] / phase_seconds:>8.1f}{100 * phase['failed'] / max(calls, 1):>9.1f}%"
+              f"{1000 * latencies[len(latencies) // 2]:>9.0f}{1000 * latencies[int(len(latencies) * 0.95)]:>9.0f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--target', choices=('http', 'llm'), default='http')
+    parser.add_argument('--phase-seconds', type=float, default=4.0)
+    args = parser.parse_args()
+
+    import logging
+    logging.disable(logging.CRITICAL)
+
+    adaptive = adaptive_concurrency.host_concurrency if args.target == 'http' else adaptive_concurrency.llm_concurrency
+    phases, history = run(args.target, ConcurrencyController(**adaptive.limiter_kwargs), args.phase_seconds)
+    report(f"adaptive {adaptive.limiter_kwargs}", phases, args.phase_seconds)
+    reasons = Counter(reason for _, _, _, reason in history)
+    print(f"limit changes (last {len(history)}): {dict(reasons)}; final limit {history[-1][1]}")
+
+    for limit in FIXED_LIMITS:
+        fixed = ConcurrencyController(initial_limit=limit, min_limit=limit, max_limit=limit)
+        phases, _ = run(args.target, fixed, args.phase_seconds)
+        report(f"fixed limit {limit}", phases, args.phase_seconds)
+
+    helper_functions.host_concurrency = adaptive_concurrency.host_concurrency
+    response_1.llm_concurrency = adaptive_concurrency.llm_concurrency
+
+
+if __name__ == '__main__':
+    main()
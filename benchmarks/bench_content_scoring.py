@@ -0,0 +1,70 @@
+"""Benchmark main-content scoring against the legacy all-elements extraction.
+
+Reports parse+extract time, characters that would be sent to the LLM and
+whether the expected bio facts survive while boilerplate is dropped.
+
+    python benchmarks/bench_content_scoring.py [--repeat N]
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from helper_functions import extract_data_from_html
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures', 'profiles')
+
+
+def load_fixtures():
+    with open(os.path.join(FIXTURE_DIR, 'expected.json'), encoding='utf-8') as f:
+        cases = json.load(f)
+    for case in cases:
+        with open(os.path.join(FIXTURE_DIR, case['file']), encoding='utf-8') as f:
+            case['html'] = f.read()
+    return cases
+
+
+def flatten(results):
+    return ' '.join(item['text'] + ' ' + ' '.join(item['links']) for item in results)
+
+
+def run(case, use_content_scoring, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        results = extract_data_from_html(case['html'], case['url'], case['name'], use_content_scoring=use_content_scoring)
+    elapsed_ms = (time.perf_counter() - start) * 1000 / repeat
+
+    payload = flatten(results)
+    recall = sum(fact in payload for fact in case['must_contain']) / len(case['must_contain'])
+    leaked = sum(noise in payload for noise in case['must_not_contain'])
+    return elapsed_ms, len(json.dumps(results)), recall, leaked
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=50)
+    args = parser.parse_args()
+
+    print(f"{'fixture':<26}{'mode':<9}{'ms/page':>9}{'chars':>8}{'recall':>8}{'leaked':>8}")
+    totals = {'legacy': [0.0, 0, 0.0, 0], 'scored': [0.0, 0, 0.0, 0]}
+    cases = load_fixtures()
+    for case in cases:
+        for mode, use_scoring in (('legacy', False), ('scored', True)):
+            elapsed_ms, chars, recall, leaked = run(case, use_scoring, args.repeat)
+            total = totals[mode]
+            total[0] += elapsed_ms
+            total[1] += chars
+            total[2] += recall
+            total[3] += leaked
+            print(f"{case['file']:<26}{mode:<9}{elapsed_ms:>9.2f}{chars:>8}{recall:>8.2f}{leaked:>8}")
+
+    print()
+    for mode, (elapsed_ms, chars, recall, leaked) in totals.items():
+        print(f"{'TOTAL':<26}{mode:<9}{elapsed_ms:>9.2f}{chars:>8}{recall / len(cases):>8.2f}{leaked:>8}")
+
+
+if __name__ == '__main__':
+    main()
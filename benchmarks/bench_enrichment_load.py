@@ -0,0 +1,139 @@
+"""Load test process_individual_urls against recorded scrape and LLM responses.
+
+    # record real firm pages and OpenAI responses once (needs network and OPENAI_API_KEY)
+    python benchmarks/bench_enrichment_load.py record employees.json --cassettes cassettes/firm
+
+    # or build an offline cassette from the profile fixtures with synthetic latencies
+    python benchmarks/bench_enrichment_load.py synth --cassettes cassettes/fixtures
+
+    # replay at 50x the recorded volume with 2% errors and 5% rate limits
+    python benchmarks/bench_enrichment_load.py replay --cassettes cassettes/fixtures --scale 50 \\
+        --error-rate 0.02 --rate-limit-rate 0.05
+
+The employees recorded or synthesised are saved next to the cassettes and
+repeated --scale times on replay. Reports throughput, per-stage latency
+percentiles and outcome counts. No Google or OpenAI credentials are needed to
+synthesise or replay.
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import process_individual_urls
+from helper_functions import get_fetch_metrics, reset_fetch_metrics
+from record_replay import FaultProfile, ReplayResponse, cassette, make_chat_client, make_chat_response
+from result_store import ResultStore
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures', 'profiles')
+EMPLOYEES_FILE = 'employees.json'
+# Median seconds and log-normal sigma for synthetic upstream latencies
+SYNTH_HTTP_LATENCY = (0.05, 0.6)
+SYNTH_LLM_LATENCY = (0.8, 0.4)
+
+
+def run(employees, mode, cassette_dir, **kwargs):
+    store = ResultStore()
+    reset_fetch_metrics()
+    try:
+        with cassette(mode, cassette_dir, **kwargs) as stats:
+            start = time.perf_counter()
+            rows = process_individual_urls({'employees': employees}, store)
+            elapsed = time.perf_counter() - start
+        return rows, elapsed, stats.summary()
+    finally:
+        store.close()
+
+
+def report(rows, elapsed, summary):
+    print(f"{rows} rows in {elapsed:.2f}s ({rows / elapsed:.1f} profiles/s)")
+    print(f"{'stage':<6}{'calls':>7}{'mean':>9}{'p50':>9}{'p95':>9}{'p99':>9}{'max':>9}  outcomes")
+    for kind, stage in sorted(summary.items()):
+        print(f"{kind:<6}{stage['calls']:>7}" + ''.join(f"{stage[name]:>9.3f}" for name in ('mean', 'p50', 'p95', 'p99', 'max'))
+              + f"  {stage['outcomes']}")
+    print(f"Fetch metrics: {get_fetch_metrics()}")
+
+
+def save_employees(cassette_dir, employees):
+    with open(os.path.join(cassette_dir, EMPLOYEES_FILE), 'w', encoding='utf-8') as f:
+        json.dump({'employees': employees}, f, indent=2)
+
+
+def record(args):
+    with open(args.input, encoding='utf-8') as f:
+        employees = json.load(f)['employees']
+    report(*run(employees, 'record', args.cassettes))
+    save_employees(args.cassettes, employees)
+
+
+def synth(args):
+    """Record against local stand-ins for the firm sites and OpenAI"""
+    rng = random.Random(args.seed)
+    with open(os.path.join(FIXTURE_DIR, 'expected.json'), encoding='utf-8') as f:
+        cases = json.load(f)
+    pages = {}
+    for case in cases:
+        with open(os.path.join(FIXTURE_DIR, case['file']), 'rb') as f:
+            pages[case['url']] = f.read()
+
+    def sleep_latency(median, sigma):
+        time.sleep(median * rng.lognormvariate(0, sigma))
+
+    def fake_get(url, **kwargs):
+        sleep_latency(*SYNTH_HTTP_LATENCY)
+        if url not in pages:
+            return ReplayResponse(url, 404, {'Content-Type': 'text/html'}, b'')
+        return ReplayResponse(url, 200, {'Content-Type': 'text/html; charset=utf-8'}, pages[url])
+
+    def fake_create(**kwargs):
+        sleep_latency(*SYNTH_LLM_LATENCY)
+        user_message = kwargs['messages'][-1]['content']
+        main_url = user_message.split('\n', 1)[0].replace('Main_URL:', '').strip()
+        content = json.dumps({'employees': {'Main_URL': main_url, 'Bio': user_message[-200:]}})
+        return make_chat_response(content)
+
+    employees = [{'Name': case['name'], 'Title': '', 'Main_URL': case['url'].rsplit('/', 1)[0],
+                  'Individual profile URLs': case['url']} for case in cases]
+    report(*run(employees, 'record', args.cassettes, http_get=fake_get, openai_client=make_chat_client(fake_create)))
+    save_employees(args.cassettes, employees)
+
+
+def replay(args):
+    with open(os.path.join(args.cassettes, EMPLOYEES_FILE), encoding='utf-8') as f:
+        employees = json.load(f)['employees'] * args.scale
+    faults = FaultProfile(latency_scale=args.latency_scale, sample_latency=args.sample_latency,
+                          error_rate=args.error_rate, rate_limit_rate=args.rate_limit_rate,
+                          timeout_rate=args.timeout_rate, seed=args.seed)
+    print(f"Replaying {len(employees)} profiles from {args.cassettes}")
+    report(*run(employees, 'replay', args.cassettes, faults=faults))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    record_parser = subparsers.add_parser('record', help="Record live responses for an employees JSON file")
+    record_parser.add_argument('input')
+    synth_parser = subparsers.add_parser('synth', help="Record the profile fixtures against local fake upstreams")
+    replay_parser = subparsers.add_parser('replay', help="Replay a cassette at scale with fault injection")
+    replay_parser.add_argument('--scale', type=int, default=10, help="Times to repeat the recorded employees")
+    replay_parser.add_argument('--latency-scale', type=float, default=1.0)
+    replay_parser.add_argument('--sample-latency', action='store_true',
+                               help="Draw latencies from the recorded distribution instead of per request")
+    replay_parser.add_argument('--error-rate', type=float, default=0.0)
+    replay_parser.add_argument('--rate-limit-rate', type=float, default=0.0)
+    replay_parser.add_argument('--timeout-rate', type=float, default=0.0)
+    for subparser in (record_parser, synth_parser, replay_parser):
+        subparser.add_argument('--cassettes', default='cassettes')
+        subparser.add_argument('--seed', type=int, default=0)
+
+    args = parser.parse_args()
+    {'record': record, 'synth': synth, 'replay': replay}[args.command](args)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,74 @@
+"""Benchmark the installed HTML parser backends on the fixture corpus.
+
+Reports parse time per page for each backend and checks that extraction
+output (bio block, clean text, links) is identical to html.parser.
+
+    python benchmarks/bench_parsers.py [--repeat N]
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from helper_functions import extract_clean_text, extract_data_from_html, extract_links
+from html_parser import available_parsers, get_parser_backend, make_soup
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures', 'profiles')
+REFERENCE_PARSER = 'html.parser'
+
+
+def load_fixtures():
+    with open(os.path.join(FIXTURE_DIR, 'expected.json'), encoding='utf-8') as f:
+        cases = json.load(f)
+    for case in cases:
+        with open(os.path.join(FIXTURE_DIR, case['file']), encoding='utf-8') as f:
+            case['html'] = f.read()
+    return cases
+
+
+def extraction_output(case, parser):
+    return (
+        extract_data_from_html(case['html'], case['url'], case['name'], parser=parser),
+        extract_clean_text(case['html'], parser=parser),
+        extract_links(case['html'], case['url'], parser=parser),
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=100)
+    args = parser.parse_args()
+
+    backends = available_parsers()
+    cases = load_fixtures()
+    print(f"Installed backends: {', '.join(backends)} (selected: {get_parser_backend()})")
+    print(f"{'fixture':<26}" + ''.join(f"{backend + ' ms':>16}" for backend in backends) + f"{'identical':>11}")
+
+    totals = dict.fromkeys(backends, 0.0)
+    mismatches = 0
+    for case in cases:
+        row = f"{case['file']:<26}"
+        for backend in backends:
+            start = time.perf_counter()
+            for _ in range(args.repeat):
+                make_soup(case['html'], backend)
+            elapsed_ms = (time.perf_counter() - start) * 1000 / args.repeat
+            totals[backend] += elapsed_ms
+            row += f"{elapsed_ms:>16.3f}"
+
+        reference = extraction_output(case, REFERENCE_PARSER)
+        identical = all(extraction_output(case, backend) == reference for backend in backends)
+        mismatches += not identical
+        print(row + f"{str(identical):>11}")
+
+    print(f"{'TOTAL':<26}" + ''.join(f"{totals[backend]:>16.3f}" for backend in backends))
+    if mismatches:
+        print(f"{mismatches} fixture(s) produced different output across backends")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
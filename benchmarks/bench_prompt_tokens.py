@@ -0,0 +1,133 @@
+"""Token accounting for the old and new response_1 prompts on the fixture corpus.
+
+Counts tokens with tiktoken when its encoding is available and falls back to
+a 4-characters-per-token estimate otherwise. Also checks that both prompt
+versions ask for the same fields.
+
+    python benchmarks/bench_prompt_tokens.py
+"""
+import json
+import os
+import re
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from DataFormatter import DataFormatter
+from helper_functions import extract_data_from_html
+from response_1 import FIELD_SCHEMA, LISTING_SYSTEM_PROMPT, PROFILE_SYSTEM_PROMPT, build_messages
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+TEAM_URL = "https://www.astorg.com/team"
+
+# Prompts as they were before compaction, kept here for comparison
+LEGACY_SYSTEM = "You are a data structuring assistant. Convert the provided raw data into a consistent JSON format."
+LEGACY_LISTING = """
+    Instructions:
+    1. Do not skip any data. If there are 100 results, return all 100.
+    2. You are a JSON-only response bot, specialized in processing employee data.
+
+    Please analyze the provided data and structure it in the following format:
+    Main Key will be "employees":
+    Below are the sub-keys
+        - 'Main_URL': {url}
+        - 'Name': The name of the individual.
+        - 'Title': Their organizational title.
+        - 'LinkedIn Profile Link': A valid LinkedIn URL containing "linkedin.com". If absent, return an empty string.
+        - 'Individual profile URLs': A unique URL associated with the individual. If absent or invalid, return an empty string.
+        - 'Bio': A brief description of the individual. If absent, return an empty string.
+        - 'Sector Expertise': Based on 'Bio', summarize the individual's sector expertise (e.g., "Cloud Computing", "Marketing").
+        - 'Additional Information'
+        - 'Additional Links'
+
+    If a field is missing or cannot be determined, return it as an empty string.
+
+    Raw data:
+    {data}
+
+    """
+LEGACY_PROFILE = """
+    Instructions:
+    1. Remember the whole data is with respect to only a single employee.
+    2. You are a JSON-only response bot, specialized in processing employee data.
+
+    Please analyze the provided data and structure it in the following format:
+    Main Key will be "employees":
+    Below are the sub-keys
+        - 'Main_URL'
+        - 'Name': The name of the individual.
+        - 'Title': Their organizational title.
+        - 'LinkedIn Profile Link': A valid LinkedIn URL containing "linkedin.com". If absent, return an empty string.
+        - 'Individual profile URLs': A unique URL associated with the individual. If absent or invalid, return an empty string.
+        - 'Bio': A brief description of the individual. If absent, return an empty string.
+        - 'Sector Expertise': Based on 'Bio', summarize the individual's sector expertise (e.g., "Cloud Computing", "Marketing").
+        - 'Additional Information': Return empty string if nothing is found
+        - 'Additional Links': Return empty string if nothing is found
+
+    If a field is missing or cannot be determined, return it as an empty string.
+
+    Raw data:
+    {data}
+
+    """
+
+FIELD_RE = re.compile(r"- '([^']+)'")
+
+
+def token_counter():
+    try:
+        import tiktoken
+        encoding = tiktoken.get_encoding('o200k_base')
+        return (lambda text: len(encoding.encode(text))), 'tiktoken o200k_base'
+    except Exception:
+        return (lambda text: -(-len(text) // 4)), 'estimate (4 chars/token)'
+
+
+def legacy_messages(kind, element_data, url):
+    if kind == 'listing':
+        user = LEGACY_LISTING.format(data=json.dumps(element_data, indent=2), url=url)
+    else:
+        user = LEGACY_PROFILE.format(data=element_data, url=url)
+    return [{"role": "system", "content": LEGACY_SYSTEM}, {"role": "user", "content": user}]
+
+
+def load_calls():
+    """Yield (label, kind, element_data, url) for every LLM call the fixtures would make"""
+    with open(os.path.join(FIXTURE_DIR, 'containers', 'team_page_paste.txt'), encoding='utf-8') as f:
+        formatted_data = DataFormatter.format_extracted_text(f.read())
+    for instance_num, instance in formatted_data['1'].items():
+        yield f"listing #{instance_num}", 'listing', instance, TEAM_URL
+
+    with open(os.path.join(FIXTURE_DIR, 'profiles', 'expected.json'), encoding='utf-8') as f:
+        cases = json.load(f)
+    for case in cases:
+        with open(os.path.join(FIXTURE_DIR, 'profiles', case['file']), encoding='utf-8') as f:
+            scraped = extract_data_from_html(f.read(), case['url'], case['name'])
+        yield f"profile {case['file']}", 'profile', scraped, case['url']
+
+
+def main():
+    count, method = token_counter()
+    legacy_fields = set(FIELD_RE.findall(LEGACY_PROFILE))
+    new_fields = set(FIELD_RE.findall(FIELD_SCHEMA))
+    assert legacy_fields == set(FIELD_RE.findall(LEGACY_LISTING)) == new_fields, (legacy_fields ^ new_fields)
+
+    print(f"Token counts: {method}")
+    print(f"{'call':<34}{'old':>8}{'new':>8}{'saved':>8}{'fixed prefix':>14}")
+    old_total = new_total = prefix_total = 0
+    for label, kind, element_data, url in load_calls():
+        old = sum(count(message['content']) for message in legacy_messages(kind, element_data, url))
+        new_messages = build_messages(LISTING_SYSTEM_PROMPT if kind == 'listing' else PROFILE_SYSTEM_PROMPT, element_data, url)
+        new = sum(count(message['content']) for message in new_messages)
+        prefix = count(new_messages[0]['content'])
+        old_total, new_total, prefix_total = old_total + old, new_total + new, prefix_total + prefix
+        print(f"{label:<34}{old:>8}{new:>8}{old - new:>8}{prefix:>14}")
+
+    print(f"{'TOTAL':<34}{old_total:>8}{new_total:>8}{old_total - new_total:>8}{prefix_total:>14}")
+    print(f"Saved {100 * (old_total - new_total) / old_total:.1f}% of prompt tokens; "
+          f"{100 * prefix_total / new_total:.1f}% of new prompt tokens sit in the fixed system prefix")
+    print(f"Fields requested (unchanged): {', '.join(sorted(new_fields))}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,140 @@
+"""Micro-benchmark url_canonical against the URL handling it replaced.
+
+Builds a synthetic corpus of profile and LinkedIn links in the variants seen on
+firm sites (http/https, www, trailing slashes, tracking parameters, fragments,
+relative paths, LinkedIn locale and mobile subdomains) with links repeated the
+way nested elements repeat them. Reports the time for the link filter in
+_extract_element_data (legacy, cold cache, warm cache) and how many distinct
+dedup keys each approach produces for the same people.
+
+    python benchmarks/bench_url_canonical.py [--people 5000] [--repeat 8]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from urllib.parse import urljoin, urlparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import url_canonical
+from helper_functions import is_valid_link
+from url_canonical import canonicalize_url, url_key
+
+FIRMS = 50
+LINKEDIN_SUBDOMAINS = ('www', 'uk', 'fr', 'de', 'nl', 'm', '')
+
+
+# URL handling as it was before url_canonical, kept here for comparison
+def legacy_is_valid_link(link, base_url):
+    if not link:
+        return False
+    absolute_link = urljoin(base_url, link)
+    return ('linkedin.com' in absolute_link or absolute_link.startswith(base_url))
+
+
+def legacy_format_url(url):
+    url = url.strip()
+    if not urlparse(url).scheme:
+        url = 'https://' + url
+    return url
+
+
+def legacy_key(url):
+    return url.strip().lower().rstrip('/')
+
+
+def profile_variants(rng, host, slug):
+    path = f"/team/{slug}"
+    return [
+        f"https://www.{host}{path}",
+        f"http://www.{host}{path}/",
+        f"https://{host}{path}",
+        f"https://www.{host}{path}?utm_source=linkedin&utm_medium=social",
+        f"https://www.{host}{path}#bio",
+        path,
+        f"{path}/?utm_content=team-grid",
+    ][:rng.randint(2, 7)]
+
+
+def linkedin_variants(rng, slug):
+    variants = []
+    for subdomain in rng.sample(LINKEDIN_SUBDOMAINS, rng.randint(2, 4)):
+        host = f"{subdomain}.linkedin.com" if subdomain else "linkedin.com"
+        variants.append(rng.choice((
+            f"https://{host}/in/{slug}",
+            f"https://{host}/in/{slug}/",
+            f"https://{host}/in/{slug}?originalSubdomain={subdomain or 'www'}",
+            f"https://{host}/in/{slug}/en",
+            f"http://{host}/in/{slug.title()}/?trk=public_profile",
+        )))
+    return variants
+
+
+def build_corpus(people, repeat, seed):
+    """Return (page_url, href) pairs and the true number of distinct profile/LinkedIn targets"""
+    rng = random.Random(seed)
+    pairs = []
+    for person in range(people):
+        host = f"firm{person % FIRMS}.example.com"
+        slug = f"person-{person}"
+        page_url = f"https://www.{host}/team/{slug}"
+        links = profile_variants(rng, host, slug) + linkedin_variants(rng, f"{slug}-{person % 97}")
+        # Nested elements repeat the same links once per enclosing element
+        for _ in range(rng.randint(1, repeat)):
+            pairs.extend((page_url, href) for href in links)
+    return pairs, 2 * people
+
+
+def time_it(fn):
+    start = time.perf_counter()
+    result = fn()
+    return time.perf_counter() - start, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--people', type=int, default=5000)
+    parser.add_argument('--repeat', type=int, default=8, help="Max times a link repeats across nested elements")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    pairs, true_targets = build_corpus(args.people, args.repeat, args.seed)
+    print(f"Corpus: {len(pairs)} links, {len(set(pairs))} distinct (page, href) pairs, {true_targets} real targets")
+
+    def legacy_filter():
+        return [urljoin(page, href) for page, href in pairs if legacy_is_valid_link(href, page)]
+
+    def canonical_filter():
+        return [canonicalize_url(href, page) for page, href in pairs if is_valid_link(href, page)]
+
+    legacy_time, legacy_links = time_it(legacy_filter)
+    url_canonical.clear_caches()
+    cold_time, canonical_links = time_it(canonical_filter)
+    warm_time, _ = time_it(canonical_filter)
+
+    print(f"\n{'link filter':<24}{'seconds':>10}{'us/link':>10}{'kept':>10}")
+    for label, seconds, kept in (('legacy urljoin', legacy_time, len(legacy_links)),
+                                 ('canonical, cold cache', cold_time, len(canonical_links)),
+                                 ('canonical, warm cache', warm_time, len(canonical_links))):
+        print(f"{label:<24}{seconds:>10.3f}{1e6 * seconds / len(pairs):>10.2f}{kept:>10}")
+    info = url_canonical.cache_info()['canonicalize_url']
+    print(f"canonicalize_url cache: {info['hits']} hits, {info['misses']} misses, {info['currsize']} entries")
+
+    # format_url on every absolute link, as response_1 does before each LLM call
+    absolute = list(dict.fromkeys(legacy_links))
+    legacy_format_time, _ = time_it(lambda: [legacy_format_url(url) for url in absolute])
+    cold_format_time, _ = time_it(lambda: [canonicalize_url(url) for url in absolute])
+    warm_format_time, _ = time_it(lambda: [canonicalize_url(url) for url in absolute])
+    print(f"\nformat_url over {len(absolute)} absolute links: legacy {legacy_format_time:.3f}s, "
+          f"canonical cold {cold_format_time:.3f}s, warm {warm_format_time:.3f}s")
+
+    legacy_keys = {legacy_key(url) for url in legacy_links}
+    canonical_keys = {url_key(url) for url in canonical_links}
+    print(f"\nDistinct dedup keys for {true_targets} real targets: legacy {len(legacy_keys)}, "
+          f"canonical {len(canonical_keys)}")
+
+
+if __name__ == '__main__':
+    main()
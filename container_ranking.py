@@ -0,0 +1,110 @@
+import logging
+import re
+import statistics
+from typing import Dict, List
+
+from url_canonical import is_linkedin_url
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Name line: 2-5 capitalised words, optional initials/particles, no digits
+NAME_TOKEN_RE = re.compile(r"^(?:[A-ZÀ-Ý][\w'’.-]*|[a-z]{1,3}|[A-Z]\.)$")
+# Job-title words that make a capitalised line a title rather than a name
+TITLE_WORDS = {
+    'partner', 'director', 'manager', 'associate', 'principal', 'officer', 'president', 'chairman',
+    'chair', 'analyst', 'vice', 'head', 'founder', 'ceo', 'cfo', 'coo', 'cto', 'advisor', 'adviser',
+    'counsel', 'team', 'about', 'contact', 'investment', 'investments', 'senior', 'managing', 'operating',
+}
+MIN_CARD_TEXT = 15
+MAX_CARD_TEXT = 1500
+
+# Weights for the features in score_container; the score is roughly 0-100
+SCORE_WEIGHTS = {
+    'name_ratio': 35.0,
+    'profile_link_ratio': 20.0,
+    'linkedin_ratio': 15.0,
+    'length_fit': 15.0,
+    'length_consistency': 10.0,
+    'instance_count': 5.0,
+}
+
+
+def looks_like_name(line: str) -> bool:
+    """Check whether a line is shaped like a person's name"""
+    line = line.strip().lstrip('#• ').strip()
+    if not line or len(line) > 60 or any(char.isdigit() for char in line):
+        return False
+    tokens = line.replace(',', ' ').split()
+    if not 2 <= len(tokens) <= 5:
+        return False
+    if any(token.lower().strip('.') in TITLE_WORDS for token in tokens):
+        return False
+    capitalised = sum(1 for token in tokens if token[0].isupper())
+    return capitalised >= 2 and all(NAME_TOKEN_RE.match(token) for token in tokens)
+
+
+def _lines(text: str) -> List[str]:
+    return [line.strip() for line in text.split('\n') if line.strip()]
+
+
+def score_container(container: Dict[str, dict]) -> Dict[str, float]:
+    """Compute cheap local features for one container and combine them into a score"""
+    instances = [instance for instance in container.values() if isinstance(instance, dict)]
+    count = len(instances)
+    if not count:
+        return {'score': 0.0, 'instances': 0}
+
+    name_hits = profile_hits = linkedin_hits = 0
+    lengths = []
+    for instance in instances:
+        text = instance.get('text', '')
+        lines = _lines(text)
+        lengths.append(len(text))
+        # Names usually lead the card, but a photo caption or title may come first
+        if any(looks_like_name(line) for line in lines[:3]):
+            name_hits += 1
+
+        hrefs = [link.get('href', '') for link in instance.get('links', []) if isinstance(link, dict)]
+        if any(is_linkedin_url(href) for href in hrefs):
+            linkedin_hits += 1
+        if any(href and not is_linkedin_url(href) and not href.startswith('mailto:') for href in hrefs):
+            profile_hits += 1
+
+    median_length = statistics.median(lengths)
+    mean_length = statistics.fmean(lengths)
+    spread = statistics.pstdev(lengths) / mean_length if mean_length else 1.0
+    in_range = sum(1 for length in lengths if MIN_CARD_TEXT <= length <= MAX_CARD_TEXT) / count
+
+    features = {
+        'name_ratio': name_hits / count,
+        'profile_link_ratio': profile_hits / count,
+        'linkedin_ratio': linkedin_hits / count,
+        'length_fit': in_range,
+        # Repeated person cards have similar lengths; a lone page section does not
+        'length_consistency': max(0.0, 1.0 - spread),
+        # Saturates around 20 cards so huge generic lists do not dominate
+        'instance_count': min(count, 20) / 20,
+    }
+    score = sum(SCORE_WEIGHTS[name] * value for name, value in features.items())
+    if count == 1:
+        # A single instance is rarely the repeated person card
+        score *= 0.5
+
+    features.update({
+        'score': round(score, 1),
+        'instances': count,
+        'median_length': median_length,
+    })
+    return features
+
+
+def rank_containers(formatted_data: Dict[str, Dict[str, dict]]) -> List[dict]:
+    """Rank containers from DataFormatter.format_extracted_text, best first"""
+    ranking = []
+    for container_num, container in formatted_data.items():
+        scores = score_container(container)
+        scores['container'] = container_num
+        ranking.append(scores)
+    ranking.sort(key=lambda scores: (-scores['score'], int(scores['container']) if str(scores['container']).isdigit() else 0))
+    return ranking
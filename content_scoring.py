@@ -0,0 +1,149 @@
+import logging
+import re
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from bs4 import BeautifulSoup
+from bs4.element import Comment, NavigableString, Tag
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+SKIP_TAGS = {'head', 'title', 'script', 'style', 'meta', 'link', 'noscript', 'template', 'svg', 'iframe'}
+BOILERPLATE_TAGS = {'nav', 'footer', 'header', 'aside', 'form', 'button', 'select'}
+BOILERPLATE_HINT_RE = re.compile(
+    r'cookie|consent|gdpr|banner|menu|navbar|nav-|breadcrumb|footer|header|sidebar|social|share|newsletter|subscribe|popup|modal',
+    re.IGNORECASE
+)
+CONTENT_HINT_RE = re.compile(r'bio|profile|person|member|team|people|content|article|detail|main', re.IGNORECASE)
+
+# Tag weights multiply a node's score; anything not listed has weight 1.0
+TAG_WEIGHTS = {
+    'article': 1.5, 'main': 1.4, 'section': 1.2, 'div': 1.0, 'td': 0.9,
+    'p': 0.8, 'li': 0.7, 'ul': 0.6, 'ol': 0.6, 'table': 0.8,
+    'span': 0.5, 'a': 0.3, 'body': 0.9, 'html': 0.8,
+}
+
+# Columns of the feature matrix returned by compute_node_features
+FEATURE_COLUMNS = ('text_len', 'link_text_len', 'boilerplate_text_len', 'paragraphs', 'depth', 'tag_weight', 'contains_name')
+
+
+def _class_and_id(tag: Tag) -> str:
+    classes = tag.get('class') or []
+    if isinstance(classes, str):
+        classes = [classes]
+    return ' '.join(classes) + ' ' + str(tag.get('id') or '')
+
+
+def compute_node_features(soup: BeautifulSoup, employee_name: str) -> Tuple[List[Tag], np.ndarray]:
+    """Compute per-node features in one traversal.
+
+    Returns the element nodes in document order and a float matrix with one row per
+    node and one column per entry in FEATURE_COLUMNS. Text lengths cover the whole
+    subtree of the node.
+    """
+    nodes: List[Tag] = []
+    index: Dict[int, int] = {}
+    parents: List[int] = []
+    depths: List[int] = []
+    weights: List[float] = []
+    own_text: List[float] = []
+    own_link_text: List[float] = []
+    own_boiler_text: List[float] = []
+    own_paragraphs: List[float] = []
+    own_name: List[float] = []
+    in_link: List[bool] = []
+    in_boiler: List[bool] = []
+    skipped = set()
+
+    for node in soup.descendants:
+        if isinstance(node, Tag):
+            parent_idx = index.get(id(node.parent), -1)
+            if node.name in SKIP_TAGS or id(node.parent) in skipped:
+                skipped.add(id(node))
+                continue
+
+            hints = _class_and_id(node)
+            content_hint = bool(CONTENT_HINT_RE.search(hints))
+            # A content hint wins over a boilerplate hint, e.g. 'profile-header'
+            boiler = node.name in BOILERPLATE_TAGS or (not content_hint and bool(BOILERPLATE_HINT_RE.search(hints)))
+            weight = TAG_WEIGHTS.get(node.name, 1.0)
+            if content_hint and not boiler:
+                weight *= 1.3
+
+            index[id(node)] = len(nodes)
+            nodes.append(node)
+            parents.append(parent_idx)
+            depths.append(depths[parent_idx] + 1 if parent_idx >= 0 else 0)
+            weights.append(weight)
+            own_text.append(0.0)
+            own_link_text.append(0.0)
+            own_boiler_text.append(0.0)
+            own_paragraphs.append(1.0 if node.name == 'p' else 0.0)
+            own_name.append(0.0)
+            in_link.append(node.name == 'a' or (parent_idx >= 0 and in_link[parent_idx]))
+            in_boiler.append(boiler or (parent_idx >= 0 and in_boiler[parent_idx]))
+
+        elif isinstance(node, NavigableString) and not isinstance(node, Comment):
+            owner = index.get(id(node.parent))
+            if owner is None:
+                continue
+            text = node.strip()
+            if not text:
+                continue
+            length = float(len(text))
+            own_text[owner] += length
+            if in_link[owner]:
+                own_link_text[owner] += length
+            if in_boiler[owner]:
+                own_boiler_text[owner] += length
+            if employee_name and employee_name in text:
+                own_name[owner] = 1.0
+
+    if not nodes:
+        return [], np.zeros((0, len(FEATURE_COLUMNS)))
+
+    parent_arr = np.asarray(parents, dtype=np.int64)
+    depth_arr = np.asarray(depths, dtype=np.int64)
+    sums = np.column_stack([own_text, own_link_text, own_boiler_text, own_paragraphs])
+    contains_name = np.asarray(own_name)
+
+    # Roll subtree totals up one depth level at a time, deepest first
+    for depth in range(int(depth_arr.max()), 0, -1):
+        level = np.nonzero(depth_arr == depth)[0]
+        level = level[parent_arr[level] >= 0]
+        np.add.at(sums, parent_arr[level], sums[level])
+        np.maximum.at(contains_name, parent_arr[level], contains_name[level])
+
+    features = np.column_stack([sums, depth_arr, np.asarray(weights), contains_name])
+    return nodes, features
+
+
+def score_nodes(features: np.ndarray) -> np.ndarray:
+    """Score every node as a candidate main-content block; higher is better"""
+    if features.size == 0:
+        return np.zeros(0)
+
+    text_len, link_len, boiler_len, paragraphs, depth, weight, contains_name = features.T
+    link_density = np.divide(link_len, text_len, out=np.zeros_like(text_len), where=text_len > 0)
+    content_len = np.maximum(text_len - link_len - boiler_len, 0.0)
+
+    # Penalise boilerplate and link-heavy mass so ancestors that swallow menus and
+    # footers lose to the tighter block holding the bio
+    scores = content_len - 2.0 * boiler_len - 1.5 * link_len
+    scores = scores * (1.0 - 0.5 * link_density) * weight
+    scores = scores + 25.0 * np.minimum(paragraphs, 8) + 2.0 * depth
+    return np.where(contains_name > 0, scores, -np.inf)
+
+
+def find_main_content(soup: BeautifulSoup, employee_name: str) -> Optional[Tag]:
+    """Return the element most likely to hold the employee's bio, or None"""
+    nodes, features = compute_node_features(soup, employee_name)
+    if not nodes:
+        return None
+
+    scores = score_nodes(features)
+    best = int(np.argmax(scores))
+    if not np.isfinite(scores[best]):
+        return None
+    return nodes[best]
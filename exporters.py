@@ -0,0 +1,95 @@
+import argparse
+import csv
+import logging
+import os
+import tempfile
+from typing import Iterable, List, Optional
+
+from openpyxl import Workbook
+from result_store import ResultStore
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+EXPORT_FORMATS = ('xlsx', 'csv')
+SHEET_TITLE = "Employees"
+
+
+def _cell(value) -> str:
+    if value is None:
+        return ""
+    return str(value)
+
+
+def write_csv(rows: Iterable[dict], columns: List[str], path: str) -> int:
+    """Write rows to a CSV file one at a time, returning the row count"""
+    written = 0
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(columns)
+        for row in rows:
+            writer.writerow([_cell(row.get(column)) for column in columns])
+            written += 1
+    return written
+
+
+def write_xlsx(rows: Iterable[dict], columns: List[str], path: str) -> int:
+    """Write rows to an XLSX file using a write-only workbook, returning the row count"""
+    # Write-only workbooks flush each row to a temp file instead of keeping cells in memory
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet(title=SHEET_TITLE)
+    sheet.append(columns)
+    written = 0
+    for row in rows:
+        sheet.append([_cell(row.get(column)) for column in columns])
+        written += 1
+    workbook.save(path)
+    return written
+
+
+def export_store(store: ResultStore, path: str, file_format: Optional[str] = None,
+                 dedupe: bool = False, firm_url: Optional[str] = None) -> int:
+    """Stream the rows of a result store into an XLSX or CSV file"""
+    file_format = (file_format or os.path.splitext(path)[1].lstrip('.')).lower()
+    if file_format not in EXPORT_FORMATS:
+        raise ValueError(f"Unsupported export format '{file_format}', expected one of {EXPORT_FORMATS}")
+
+    columns = store.columns()
+    rows = store.iter_rows(dedupe=dedupe, firm_url=firm_url)
+    if file_format == 'csv':
+        written = write_csv(rows, columns, path)
+    else:
+        written = write_xlsx(rows, columns, path)
+
+    logger.info(f"Exported {written} rows to {path}")
+    return written
+
+
+def export_to_tempfile(store: ResultStore, file_format: str, dedupe: bool = False,
+                       firm_url: Optional[str] = None) -> str:
+    """Export a result store to a temporary file and return its path"""
+    fd, path = tempfile.mkstemp(prefix="fm_export_", suffix=f".{file_format}")
+    os.close(fd)
+    export_store(store, path, file_format, dedupe=dedupe, firm_url=firm_url)
+    return path
+
+
+def main():
+    """Command line entry point for exporting a saved result store"""
+    parser = argparse.ArgumentParser(description="Export staged employee results to XLSX or CSV")
+    parser.add_argument("store", help="Path to the SQLite result store")
+    parser.add_argument("output", help="Output file path (.xlsx or .csv)")
+    parser.add_argument("--format", choices=EXPORT_FORMATS, help="Override the format implied by the output extension")
+    parser.add_argument("--dedupe", action="store_true", help="Keep only the latest row for each person")
+    parser.add_argument("--firm", help="Only export rows for this firm URL")
+    args = parser.parse_args()
+
+    store = ResultStore(args.store)
+    try:
+        export_store(store, args.output, args.format, dedupe=args.dedupe, firm_url=args.firm)
+    finally:
+        store.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -298,15 +298,103 @@ function findPersonContainers(knownName, topN = 5) {
 // ... [previous helper functions A through H remain the same] ...
 
 /*****************************************************
- * I) Main function to find and copy top person containers to clipboard
+ * I) Utility: Build the structured (JSON) form of the containers
+ *    - Uses the browser's own innerText rendering instead of regex stripping
+ *    - Links are resolved to absolute URLs
  *****************************************************/
-function findAndCopyTopPersonContainers(knownName, topN = 5) {
+function getStructuredInstance(container) {
+  const text = container.innerText
+    .split("\n")
+    .map((line) => line.trim())
+    .filter((line) => line)
+    .join("\n");
+
+  const links = [];
+  const seen = new Set();
+  container.querySelectorAll("a[href]").forEach((a) => {
+    if (!isElementVisible(a)) return;
+    const href = a.href;
+    if (href && /^https?:/i.test(href) && !seen.has(href)) {
+      seen.add(href);
+      links.push({ text: a.innerText.trim(), href });
+    }
+  });
+
+  return { text, links };
+}
+
+function buildStructuredOutput(topContainersList, format) {
+  if (format === "jsonl") {
+    // One instance per line, so very large pages can be read line by line
+    const lines = [];
+    topContainersList.forEach((containerData, idx) => {
+      containerData.allContainers.forEach((container, cIdx) => {
+        lines.push(JSON.stringify({
+          container: idx + 1,
+          instance: cIdx + 1,
+          ...getStructuredInstance(container),
+        }));
+      });
+    });
+    return lines.join("\n");
+  }
+
+  return JSON.stringify({
+    format: "fm-containers",
+    version: 1,
+    url: window.location.href,
+    containers: topContainersList.map((containerData, idx) => ({
+      container: idx + 1,
+      signature: containerData.signature,
+      instances: containerData.allContainers.map((container, cIdx) => ({
+        instance: cIdx + 1,
+        ...getStructuredInstance(container),
+      })),
+    })),
+  });
+}
+
+/*****************************************************
+ * J) Utility: Copy text to the clipboard, with a textarea fallback
+ *****************************************************/
+function copyToClipboard(finalText) {
+  navigator.clipboard.writeText(finalText)
+    .then(() => {
+      console.log("Successfully copied containers text to clipboard!");
+    })
+    .catch(err => {
+      console.error("Failed to copy text: ", err);
+      // Fallback method using a temporary textarea
+      const textarea = document.createElement("textarea");
+      textarea.value = finalText;
+      document.body.appendChild(textarea);
+      textarea.select();
+      try {
+        document.execCommand("copy");
+        console.log("Successfully copied containers text to clipboard (fallback method)!");
+      } catch (e) {
+        console.error("Failed to copy text (fallback method): ", e);
+      }
+      document.body.removeChild(textarea);
+    });
+}
+
+/*****************************************************
+ * K) Main function to find and copy top person containers to clipboard
+ *    - format: "text" (default), "json" or "jsonl"
+ *****************************************************/
+function findAndCopyTopPersonContainers(knownName, topN = 5, format = "text") {
   const topContainersList = findPersonContainers(knownName, topN);
   if (!topContainersList) {
     console.warn("No result found. Nothing to copy.");
     return;
   }
 
+  if (format === "json" || format === "jsonl") {
+    copyToClipboard(buildStructuredOutput(topContainersList, format));
+    return;
+  }
+
   // Prepare content for all top containers
   let finalText = "";
 
@@ -335,26 +423,7 @@ function findAndCopyTopPersonContainers(knownName, topN = 5) {
     return;
   }
 
-  // Copy to clipboard using the Clipboard API
-  navigator.clipboard.writeText(finalText)
-    .then(() => {
-      console.log("Successfully copied containers text to clipboard!");
-    })
-    .catch(err => {
-      console.error("Failed to copy text: ", err);
-      // Fallback method using a temporary textarea
-      const textarea = document.createElement("textarea");
-      textarea.value = finalText;
-      document.body.appendChild(textarea);
-      textarea.select();
-      try {
-        document.execCommand("copy");
-        console.log("Successfully copied containers text to clipboard (fallback method)!");
-      } catch (e) {
-        console.error("Failed to copy text (fallback method): ", e);
-      }
-      document.body.removeChild(textarea);
-    });
+  copyToClipboard(finalText);
 }
 
 findAndCopyTopPersonContainers("Lynn Loo");
\ No newline at end of file
@@ -4,15 +4,21 @@ import pyperclip
 import json
 import re
 import logging
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Tuple
 import requests
 from bs4 import BeautifulSoup
 from bs4.element import Tag
-from urllib.parse import urljoin
 import os
+import codecs
+import threading
+from collections import Counter
 from openpyxl import load_workbook
 from streamlit_option_menu import option_menu
 from requests.exceptions import RequestException
+from adaptive_concurrency import host_concurrency
+from content_scoring import find_main_content
+from html_parser import make_soup
+from url_canonical import canonicalize_url, host_key, is_linkedin_url, site_root
 from response_1 import process_element_with_gpt, process_element_with_gpt_2
 from DataFormatter import DataFormatter
 from UI import UI
@@ -21,18 +27,129 @@ from UI import UI
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-def make_request(url: str) -> Optional[str]:
-    """Make HTTP request with proper headers and error handling"""
-    headers = {
-        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-    }
+REQUEST_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+}
+REQUEST_TIMEOUT = 30
+
+# Streaming download limits
+ALLOWED_CONTENT_TYPES = ('text/html', 'application/xhtml+xml', 'text/plain')
+MAX_RESPONSE_BYTES = 2 * 1024 * 1024
+DOWNLOAD_CHUNK_SIZE = 64 * 1024
+ENCODING_SNIFF_BYTES = 4096
+
+_META_CHARSET_RE = re.compile(rb'''<meta[^>]+charset\s*=\s*["']?\s*([A-Za-z0-9_.:-]+)''', re.IGNORECASE)
+_BOMS = ((codecs.BOM_UTF8, 'utf-8-sig'), (codecs.BOM_UTF16_LE, 'utf-16'), (codecs.BOM_UTF16_BE, 'utf-16'))
+
+_fetch_metrics = Counter()
+_fetch_metrics_lock = threading.Lock()
+
+# requests.get-compatible callable used by make_request; swapped out by the record/replay harness
+_http_get = requests.get
+
+def set_http_transport(get=None):
+    """Route make_request through another requests.get-compatible callable, returning the previous one"""
+    global _http_get
+    previous = _http_get
+    _http_get = get or requests.get
+    return previous
+
+def _record_fetch(**counts):
+    with _fetch_metrics_lock:
+        _fetch_metrics.update(counts)
+
+def get_fetch_metrics() -> Dict[str, int]:
+    """Return a snapshot of download counters (fetched, aborted, truncated, failed, bytes)"""
+    with _fetch_metrics_lock:
+        return dict(_fetch_metrics)
+
+def reset_fetch_metrics():
+    """Clear all download counters"""
+    with _fetch_metrics_lock:
+        _fetch_metrics.clear()
+
+def _lookup_encoding(name) -> Optional[str]:
+    if not name:
+        return None
+    if isinstance(name, bytes):
+        name = name.decode('ascii', errors='ignore')
+    try:
+        return codecs.lookup(name.strip().strip('"\'')).name
+    except LookupError:
+        return None
+
+def resolve_encoding(content_type: str, head: bytes) -> str:
+    """Resolve the body encoding from headers, BOM or <meta> without scanning the whole body"""
+    for bom, encoding in _BOMS:
+        if head.startswith(bom):
+            return encoding
+    
+    for param in (content_type or '').split(';')[1:]:
+        key, _, value = param.partition('=')
+        if key.strip().lower() == 'charset':
+            encoding = _lookup_encoding(value)
+            if encoding:
+                return encoding
     
+    meta_match = _META_CHARSET_RE.search(head[:ENCODING_SNIFF_BYTES])
+    if meta_match:
+        encoding = _lookup_encoding(meta_match.group(1))
+        if encoding:
+            return encoding
+    
+    return 'utf-8'
+
+def make_request(url: str, max_bytes: int = MAX_RESPONSE_BYTES,
+                 allowed_content_types: Tuple[str, ...] = ALLOWED_CONTENT_TYPES) -> Optional[str]:
+    """Make HTTP request with proper headers and error handling.
+    
+    The body is streamed and the download is abandoned early when the content type
+    is not in the allowlist; bodies larger than max_bytes are truncated. Concurrent
+    calls to the same host are limited by its adaptive limiter.
+    """
     try:
-        response = requests.get(url, headers=headers, timeout=30)
-        response.raise_for_status()
-        return response.text
+        with host_concurrency.track(host_key(url)), \
+                _http_get(url, headers=REQUEST_HEADERS, timeout=REQUEST_TIMEOUT, stream=True) as response:
+            response.raise_for_status()
+            
+            content_type = response.headers.get('Content-Type', '')
+            mime_type = content_type.split(';')[0].strip().lower()
+            if mime_type and allowed_content_types and mime_type not in allowed_content_types:
+                logger.warning(f"Skipping URL {url}: unsupported content type '{mime_type}'")
+                _record_fetch(aborted_content_type=1)
+                return None
+            
+            declared_length = response.headers.get('Content-Length', '')
+            if declared_length.isdigit() and int(declared_length) > max_bytes:
+                logger.warning(f"URL {url} declares {declared_length} bytes, reading only the first {max_bytes}")
+            
+            chunks = []
+            received = 0
+            truncated = False
+            for chunk in response.iter_content(chunk_size=DOWNLOAD_CHUNK_SIZE):
+                if not chunk:
+                    continue
+                remaining = max_bytes - received
+                if len(chunk) > remaining:
+                    # Any data past the cap, including a chunk after one that ended exactly on it
+                    chunks.append(chunk[:remaining])
+                    received += remaining
+                    truncated = True
+                    break
+                chunks.append(chunk)
+                received += len(chunk)
+            
+            body = b''.join(chunks)
+            encoding = resolve_encoding(content_type, body[:ENCODING_SNIFF_BYTES])
+            
+            if truncated:
+                logger.warning(f"Truncated URL {url} at {max_bytes} bytes")
+                _record_fetch(truncated=1)
+            _record_fetch(fetched=1, bytes_read=received)
+            return body.decode(encoding, errors='replace')
     except RequestException as e:
         logger.error(f"Failed to fetch URL {url}: {str(e)}")
+        _record_fetch(failed=1)
         return None
 
 def is_valid_link(link: str, base_url: str) -> bool:
@@ -40,8 +157,92 @@ def is_valid_link(link: str, base_url: str) -> bool:
     if not link:
         return False
         
-    absolute_link = urljoin(base_url, link)
-    return ('linkedin.com' in absolute_link or absolute_link.startswith(base_url))
+    absolute_link = canonicalize_url(link, base_url)
+    return is_linkedin_url(absolute_link) or absolute_link.startswith(canonicalize_url(base_url))
+
+def _extract_element_data(element: Tag, url: str, employee_name: str) -> Optional[Dict]:
+    """Extract the text from the employee name onwards and the links that follow it"""
+    full_text = element.get_text(strip=True, separator=' ')
+    
+    # Skip empty elements
+    if not full_text:
+        return None
+    
+    # Find the starting position of employee name in the text
+    name_position = full_text.find(employee_name)
+    
+    # Skip if employee name not found in this element
+    if name_position == -1:
+        return None
+        
+    # Extract text starting from employee name
+    filtered_text = full_text[name_position:]
+    
+    # Collect links that appear after the employee name
+    links = []
+    
+    for a_tag in element.find_all('a', href=True):
+        # Get the text position of this link in the full content
+        link_text = a_tag.get_text(strip=True)
+        link_position = full_text.find(link_text)
+        
+        # Only include links that appear after the employee name
+        if link_position >= name_position:
+            href = a_tag.get('href')
+            if is_valid_link(href, url):
+                links.append(canonicalize_url(href, url))
+    
+    return {
+        'text': filtered_text,
+        'links': links
+    }
+
+def extract_matching_elements(soup: BeautifulSoup, url: str, employee_name: str) -> List[Dict]:
+    """Extract data from every element whose text contains the employee name"""
+    # Instead of searching for 'main' class, get all elements
+    elements = soup.find_all()
+    
+    seen_content = set()
+    results = []
+    
+    for element in elements:
+        if not isinstance(element, Tag):
+            continue
+        
+        # Skip script, style, and other non-content tags
+        if element.name in ['script', 'style', 'meta', 'link', 'noscript']:
+            continue
+        
+        element_data = _extract_element_data(element, url, employee_name)
+        if not element_data:
+            continue
+        
+        content_hash = hash(f"{element_data['text']}{''.join(sorted(element_data['links']))}")
+        
+        if content_hash not in seen_content and (element_data['text'] or element_data['links']):
+            seen_content.add(content_hash)
+            results.append(element_data)
+    
+    return results
+
+def extract_data_from_html(html_content: str, url: str, employee_name: str, use_content_scoring: bool = True,
+                           parser: Optional[str] = None) -> List[Dict]:
+    """Extract the employee's bio block from a profile page.
+    
+    With content scoring only the highest scoring region around the employee name is
+    returned; when no region is found every matching element is returned instead.
+    """
+    soup = make_soup(html_content, parser)
+    
+    if use_content_scoring:
+        main_content = find_main_content(soup, employee_name)
+        if main_content is not None:
+            element_data = _extract_element_data(main_content, url, employee_name)
+            if element_data:
+                return [element_data]
+        logger.info(f"No main content block found for '{employee_name}' on {url}, using all matching elements")
+    
+    return extract_matching_elements(soup, url, employee_name)
 
 def extract_data_from_url(url: str, employee_name: str) -> List[Dict]:
     html_content = make_request(url)
@@ -49,63 +250,7 @@ def extract_data_from_url(url: str, employee_name: str) -> List[Dict]:
         return []
     
     try:
-        soup = BeautifulSoup(html_content, 'html.parser')
-        # Instead of searching for 'main' class, get all elements
-        elements = soup.find_all()
-        
-        seen_content = set()
-        results = []
-        
-        for element in elements:
-            if not isinstance(element, Tag):
-                continue
-            
-            # Skip script, style, and other non-content tags
-            if element.name in ['script', 'style', 'meta', 'link', 'noscript']:
-                continue
-                
-            full_text = element.get_text(strip=True, separator=' ')
-            
-            # Skip empty elements
-            if not full_text:
-                continue
-            
-            # Find the starting position of employee name in the text
-            name_position = full_text.find(employee_name)
-            
-            # Skip if employee name not found in this element
-            if name_position == -1:
-                continue
-                
-            # Extract text starting from employee name
-            filtered_text = full_text[name_position:]
-            
-            # Collect links that appear after the employee name
-            links = []
-            cumulative_text = ''
-            
-            for a_tag in element.find_all('a', href=True):
-                # Get the text position of this link in the full content
-                link_text = a_tag.get_text(strip=True)
-                link_position = full_text.find(link_text)
-                
-                # Only include links that appear after the employee name
-                if link_position >= name_position:
-                    href = a_tag.get('href')
-                    if is_valid_link(href, url):
-                        full_url = urljoin(url, href)
-                        links.append(full_url)
-            
-            content_hash = hash(f"{filtered_text}{''.join(sorted(links))}")
-            
-            if content_hash not in seen_content and (filtered_text or links):
-                seen_content.add(content_hash)
-                results.append({
-                    'text': filtered_text,
-                    'links': links
-                })
-        
-        return results
+        return extract_data_from_html(html_content, url, employee_name)
         
     except Exception as e:
         logger.error(f"Error processing URL '{url}': {str(e)}")
@@ -139,16 +284,12 @@ def validate_employee_data(data: dict) -> bool:
     return True
 
 def get_base_url(url: str) -> str:
-    # Split URL by dots and get components
-    url_parts = url.split('/')
-    if len(url_parts) >= 3:  # Make sure we have protocol and domain
-        return '/'.join(url_parts[:3])  # This gets us 'https://www.domain.com'
-    return url
+    # This gets us 'https://www.domain.com'
+    return site_root(url)
 
 def normalize_url(url: str, base_url: str) -> str:
-    if url.startswith('/'):
-        return f"{base_url.rstrip('/')}{url}"
-    return url
+    # Resolve against the base and canonicalize (tracking params, LinkedIn variants)
+    return canonicalize_url(url, base_url)
 
 def format_additional_links(links) -> str:
     if links is None:
@@ -175,7 +316,7 @@ def process_employee_data(employee_data: dict) -> dict:
             
     return processed_data
 
-def extract_clean_text(html_content):
+def extract_clean_text(html_content, parser=None):
     """Extract and clean text from HTML content"""
     if not html_content or pd.isna(html_content):
         return ""
@@ -183,7 +324,7 @@ def extract_clean_text(html_content):
     if isinstance(html_content, (float, int)):
         return str(html_content)
     
-    soup = BeautifulSoup(str(html_content), 'html.parser')
+    soup = make_soup(str(html_content), parser)
     
     # Remove script and style elements
     for element in soup(['script', 'style']):
@@ -195,20 +336,18 @@ def extract_clean_text(html_content):
     text = re.sub(r'\s+', ' ', text).strip()
     return text
 
-def extract_links(html_content, base_url=""):
+def extract_links(html_content, base_url="", parser=None):
     """Extract all links from HTML content"""
     if not html_content or pd.isna(html_content):
         return []
     
-    soup = BeautifulSoup(str(html_content), 'html.parser')
+    soup = make_soup(str(html_content), parser)
     links = []
     
     for a in soup.find_all('a', href=True):
         href = a['href']
-        # Make relative URLs absolute
-        if base_url and not href.startswith(('http://', 'https://')):
-            href = urljoin(base_url, href)
-        links.append(href)
+        # Make relative URLs absolute and canonical
+        links.append(canonicalize_url(href, base_url))
     
     return links
 
@@ -0,0 +1,45 @@
+import importlib.util
+import logging
+import os
+from functools import lru_cache
+from typing import List, Optional
+
+from bs4 import BeautifulSoup
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Fastest first, per benchmarks/bench_parsers.py; html.parser ships with Python
+PARSER_PREFERENCE = ('lxml', 'html.parser')
+PARSER_MODULES = {
+    'lxml': 'lxml',
+    'html.parser': None,
+}
+PARSER_ENV_VAR = "FM_HTML_PARSER"
+
+
+def available_parsers() -> List[str]:
+    """Return the installed parser backends in order of preference"""
+    parsers = []
+    for parser in PARSER_PREFERENCE:
+        module = PARSER_MODULES.get(parser)
+        if module is None or importlib.util.find_spec(module) is not None:
+            parsers.append(parser)
+    return parsers
+
+
+@lru_cache(maxsize=None)
+def get_parser_backend() -> str:
+    """Pick the parser backend, honouring FM_HTML_PARSER when it is installed"""
+    parsers = available_parsers()
+    requested = os.getenv(PARSER_ENV_VAR, "").strip()
+    if requested:
+        if requested in parsers:
+            return requested
+        logger.warning(f"HTML parser '{requested}' is not available, falling back to '{parsers[0]}'")
+    return parsers[0]
+
+
+def make_soup(markup, parser: Optional[str] = None) -> BeautifulSoup:
+    """Parse markup with the selected backend"""
+    return BeautifulSoup(markup, parser or get_parser_backend())
@@ -0,0 +1,243 @@
+import hashlib
+import json
+import logging
+import re
+import zlib
+from typing import Callable, Dict, Hashable, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from url_canonical import url_key
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+NUM_PERMUTATIONS = 64
+LSH_BANDS = 16
+SHINGLE_SIZE = 3
+SIMILARITY_THRESHOLD = 0.8
+# Keeps a * x + b within uint64 for 32-bit shingle hashes
+MERSENNE_PRIME = (1 << 31) - 1
+
+_WORD_RE = re.compile(r'\w+')
+
+
+def _shingles(text: str, size: int = SHINGLE_SIZE) -> set:
+    words = _WORD_RE.findall(text.lower())
+    if len(words) < size:
+        return {' '.join(words)} if words else set()
+    return {' '.join(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+
+def _first_line(text: str) -> str:
+    for line in text.split('\n'):
+        line = ' '.join(line.split()).lower()
+        if line:
+            return line
+    return ''
+
+
+def _lines(text: str) -> set:
+    return {line for line in (' '.join(line.split()).lower() for line in text.split('\n')) if line}
+
+
+def _person_links(instance: dict) -> set:
+    links = set()
+    for link in instance.get('links', []):
+        href = link.get('href', '') if isinstance(link, dict) else str(link)
+        if href:
+            links.add(url_key(href))
+    return links
+
+
+class InstanceIndex:
+    """MinHash/LSH index that clusters near-duplicate instances across containers"""
+
+    def __init__(self, num_perm: int = NUM_PERMUTATIONS, bands: int = LSH_BANDS,
+                 threshold: float = SIMILARITY_THRESHOLD, seed: int = 1):
+        if num_perm % bands:
+            raise ValueError("num_perm must be divisible by bands")
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.threshold = threshold
+        rng = np.random.default_rng(seed)
+        self._a = rng.integers(1, MERSENNE_PRIME, size=num_perm, dtype=np.uint64)
+        self._b = rng.integers(0, MERSENNE_PRIME, size=num_perm, dtype=np.uint64)
+
+        self._keys: List[Hashable] = []
+        self._instances: Dict[Hashable, dict] = {}
+        self._shingles: Dict[Hashable, set] = {}
+        self._buckets: Dict[Tuple[int, bytes], List[Hashable]] = {}
+        self._name_buckets: Dict[str, List[Hashable]] = {}
+        self._parent: Dict[Hashable, Hashable] = {}
+        # Candidate pairs are judged once every name line is known, see _merge_pending
+        self._pending: List[Tuple[Hashable, Hashable]] = []
+
+    def _signature(self, shingles: set) -> np.ndarray:
+        hashes = np.fromiter((zlib.crc32(s.encode('utf-8')) for s in shingles), dtype=np.uint64, count=len(shingles))
+        # (a * x + b) mod p for every permutation and shingle at once, then min per permutation
+        products = (np.outer(self._a, hashes) + self._b[:, None]) % np.uint64(MERSENNE_PRIME)
+        return products.min(axis=1)
+
+    def _find(self, key: Hashable) -> Hashable:
+        root = key
+        while self._parent[root] != root:
+            root = self._parent[root]
+        while self._parent[key] != root:
+            self._parent[key], key = root, self._parent[key]
+        return root
+
+    def _union(self, left: Hashable, right: Hashable) -> None:
+        left_root, right_root = self._find(left), self._find(right)
+        if left_root != right_root:
+            self._parent[right_root] = left_root
+
+    def _covers_other_people(self, larger: Hashable, smaller: Hashable) -> bool:
+        """Whether the larger instance names people or links profiles the smaller one lacks, e.g. a grid wrapper"""
+        larger_text = self._instances[larger].get('text', '')
+        smaller_text = self._instances[smaller].get('text', '')
+        # Name lines are lines that start some indexed instance
+        larger_names = _lines(larger_text) & self._name_buckets.keys()
+        if larger_names - _lines(smaller_text):
+            return True
+
+        smaller_links = _person_links(self._instances[smaller])
+        return bool(smaller_links and _person_links(self._instances[larger]) - smaller_links)
+
+    def _is_duplicate(self, left: Hashable, right: Hashable) -> bool:
+        left_links = _person_links(self._instances[left])
+        right_links = _person_links(self._instances[right])
+        if left_links and right_links and not left_links & right_links:
+            return False
+
+        if len(self._instances[left].get('text', '')) >= len(self._instances[right].get('text', '')):
+            larger, smaller = left, right
+        else:
+            larger, smaller = right, left
+        if self._covers_other_people(larger, smaller):
+            return False
+
+        left_text = self._instances[left].get('text', '')
+        right_text = self._instances[right].get('text', '')
+        left_name, right_name = _first_line(left_text), _first_line(right_text)
+        if left_name and left_name == right_name:
+            # A name-only element nested inside the full card
+            if ' '.join(left_text.split()).lower() == left_name or ' '.join(right_text.split()).lower() == right_name:
+                return True
+
+        a, b = self._shingles[left], self._shingles[right]
+        if not a or not b:
+            return False
+        overlap = len(a & b)
+        # Containment catches a card's inner div, Jaccard catches re-rendered copies
+        return overlap / min(len(a), len(b)) >= self.threshold or overlap / len(a | b) >= self.threshold
+
+    def add(self, key: Hashable, instance: dict) -> None:
+        """Index an instance and queue it for merging with any candidate duplicates"""
+        text = instance.get('text', '')
+        shingles = _shingles(text)
+        self._keys.append(key)
+        self._instances[key] = instance
+        self._shingles[key] = shingles
+        self._parent[key] = key
+
+        candidates = set()
+        if shingles:
+            signature = self._signature(shingles)
+            for band in range(self.bands):
+                band_key = (band, signature[band * self.rows:(band + 1) * self.rows].tobytes())
+                bucket = self._buckets.setdefault(band_key, [])
+                candidates.update(bucket)
+                bucket.append(key)
+
+        # Nested cards share their name line even when one is much shorter
+        name = _first_line(text)
+        if name:
+            bucket = self._name_buckets.setdefault(name, [])
+            candidates.update(bucket)
+            bucket.append(key)
+
+        self._pending.extend((other, key) for other in candidates)
+
+    def _merge_pending(self) -> None:
+        for other, key in self._pending:
+            if self._is_duplicate(key, other):
+                self._union(other, key)
+        self._pending.clear()
+
+    def clusters(self) -> List[List[Hashable]]:
+        """Return clusters of keys, in insertion order"""
+        self._merge_pending()
+        grouped: Dict[Hashable, List[Hashable]] = {}
+        for key in self._keys:
+            grouped.setdefault(self._find(key), []).append(key)
+        return list(grouped.values())
+
+    def _richness(self, key: Hashable) -> Tuple[int, int]:
+        instance = self._instances[key]
+        return len(instance.get('text', '')), len(instance.get('links', []))
+
+    def instance(self, key: Hashable) -> dict:
+        """Return the instance stored under a key"""
+        return self._instances[key]
+
+    def representatives(self, preferred: Optional[Iterable[Hashable]] = None) -> Dict[Hashable, Hashable]:
+        """Map every key to its cluster's richest instance (longest text, then most links).
+
+        With preferred keys, e.g. the selected container's, the representative is
+        taken from those whenever the cluster has one.
+        """
+        preferred = set(preferred or ())
+        mapping = {}
+        for members in self.clusters():
+            candidates = [member for member in members if member in preferred] or members
+            best = max(candidates, key=self._richness)
+            for member in members:
+                mapping[member] = best
+        return mapping
+
+
+def build_instance_index(formatted_data: Dict[str, Dict[str, dict]], **kwargs) -> InstanceIndex:
+    """Index every instance of every container from DataFormatter.format_extracted_text"""
+    index = InstanceIndex(**kwargs)
+    for container_num, container in formatted_data.items():
+        for instance_num, instance in container.items():
+            index.add((container_num, instance_num), instance)
+    return index
+
+
+def instance_fingerprint(instance: dict, url: str = "") -> str:
+    """Stable content hash for caching results of an instance across reruns"""
+    payload = json.dumps([url, instance.get('text', ''), instance.get('links', [])], sort_keys=True)
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+
+def map_deduplicated(keys: Iterable[Hashable], index: InstanceIndex, fn: Callable[[dict], object],
+                     cache: Optional[Dict[str, object]] = None, url: str = "") -> Dict[Hashable, object]:
+    """Call fn once per cluster of near-duplicate instances and fan the result out to every key.
+
+    With a cache, results are also reused for clusters processed by earlier calls,
+    e.g. when the user tries a different container.
+    """
+    keys = list(keys)
+    representatives = index.representatives(keys)
+    results_by_rep: Dict[Hashable, object] = {}
+    results = {}
+    calls = 0
+    for key in keys:
+        rep = representatives[key]
+        if rep not in results_by_rep:
+            instance = index.instance(rep)
+            fingerprint = instance_fingerprint(instance, url)
+            if cache is not None and fingerprint in cache:
+                results_by_rep[rep] = cache[fingerprint]
+            else:
+                results_by_rep[rep] = fn(instance)
+                calls += 1
+                if cache is not None and results_by_rep[rep] is not None:
+                    cache[fingerprint] = results_by_rep[rep]
+        results[key] = results_by_rep[rep]
+
+    logger.info(f"Processed {len(results)} instances with {calls} calls ({len(results_by_rep)} unique)")
+    return results
@@ -0,0 +1,338 @@
+import json
+import logging
+import re
+import threading
+from collections import Counter
+from contextlib import nullcontext
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+from urllib.parse import parse_qsl, urlencode, urljoin, urlparse, urlunparse
+
+from bs4.element import Tag
+
+from container_ranking import looks_like_name
+from helper_functions import ALLOWED_CONTENT_TYPES, make_request
+from html_parser import make_soup
+from url_canonical import canonicalize_url, host_key, is_linkedin_url, url_key
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+MAX_PAGES = 50
+MAX_WORKERS = 16
+# Optional hard cap per host on top of the adaptive limit make_request applies
+PER_HOST_LIMIT = None
+PAGE_CONTENT_TYPES = ALLOWED_CONTENT_TYPES + ('application/json', 'text/json')
+
+PAGE_PARAMS = ('page', 'p', 'pg', 'paged', 'page_num', 'pagenum')
+PATH_PAGE_RE = re.compile(r'/page/(\d+)/?$')
+CONTAINER_TAGS = ('div', 'li', 'section', 'article')
+LOAD_MORE_TEXT_RE = re.compile(r'load more|show more|view more|see more|more people|more team', re.IGNORECASE)
+LOAD_MORE_CLASS_RE = re.compile(r'load-?more|show-?more', re.IGNORECASE)
+LOAD_MORE_ATTRS = ('data-url', 'data-next', 'data-next-url', 'data-endpoint', 'data-load-more')
+JSON_NEXT_KEYS = ('next', 'next_url', 'nextUrl', 'next_page_url', 'nextPageUrl', 'next_page')
+JSON_HTML_KEYS = ('html', 'content', 'markup', 'data', 'results', 'items')
+
+
+class HostLimiter:
+    """Caps concurrent requests per host; with no cap, slots are free"""
+
+    def __init__(self, per_host_limit: Optional[int] = PER_HOST_LIMIT):
+        self.per_host_limit = per_host_limit
+        self._semaphores: Dict[str, threading.BoundedSemaphore] = {}
+        self._lock = threading.Lock()
+
+    def slot(self, url: str):
+        if self.per_host_limit is None:
+            return nullcontext()
+        host = host_key(url)
+        with self._lock:
+            if host not in self._semaphores:
+                self._semaphores[host] = threading.BoundedSemaphore(self.per_host_limit)
+            return self._semaphores[host]
+
+
+def fetch_pages(urls: Iterable[str], max_workers: int = MAX_WORKERS,
+                limiter: Optional[HostLimiter] = None) -> Dict[str, Optional[str]]:
+    """Fetch pages concurrently, keeping the input order"""
+    urls = list(dict.fromkeys(urls))
+    limiter = limiter or HostLimiter()
+
+    def fetch(url):
+        with limiter.slot(url):
+            return make_request(url, allowed_content_types=PAGE_CONTENT_TYPES)
+
+    if not urls:
+        return {}
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(urls))) as executor:
+        return dict(zip(urls, executor.map(fetch, urls)))
+
+
+def _same_site(url: str, page_url: str) -> bool:
+    return host_key(url) == host_key(page_url)
+
+
+def _with_query_param(url: str, key: str, value: int) -> str:
+    parsed = urlparse(url)
+    query = [(k, v) for k, v in parse_qsl(parsed.query, keep_blank_values=True) if k != key]
+    query.append((key, str(value)))
+    return urlunparse(parsed._replace(query=urlencode(query)))
+
+
+def _with_path_page(url: str, value: int) -> str:
+    parsed = urlparse(url)
+    base_path = PATH_PAGE_RE.sub('', parsed.path).rstrip('/')
+    return urlunparse(parsed._replace(path=f"{base_path}/page/{value}/"))
+
+
+def detect_numbered_pages(soup, page_url: str, max_pages: int = MAX_PAGES) -> List[str]:
+    """Find ?page=N or /page/N pagination links and expand them to every page URL"""
+    page_path = PATH_PAGE_RE.sub('', urlparse(page_url).path).rstrip('/')
+    query_pages: Counter = Counter()
+    path_pages = []
+
+    for anchor in soup.find_all(['a', 'link'], href=True):
+        href = urljoin(page_url, anchor['href'])
+        if not _same_site(href, page_url):
+            continue
+        parsed = urlparse(href)
+
+        path_match = PATH_PAGE_RE.search(parsed.path)
+        if path_match and PATH_PAGE_RE.sub('', parsed.path).rstrip('/') == page_path:
+            path_pages.append(int(path_match.group(1)))
+            continue
+
+        if parsed.path.rstrip('/') != page_path:
+            continue
+        for key, value in parse_qsl(parsed.query):
+            if key.lower() in PAGE_PARAMS and value.isdigit():
+                query_pages[(key, int(value))] += 1
+
+    urls = []
+    if path_pages:
+        last_page = min(max(path_pages), max_pages)
+        urls.extend(_with_path_page(page_url, n) for n in range(2, last_page + 1))
+    if query_pages:
+        key = Counter(key for key, _ in query_pages).most_common(1)[0][0]
+        numbers = [n for k, n in query_pages if k == key]
+        # Zero-based pagination starts at 1 for the second page
+        first_other = 1 if min(numbers) == 0 else 2
+        last_page = min(max(numbers), max_pages)
+        urls.extend(_with_query_param(page_url, key, n) for n in range(first_other, last_page + 1))
+
+    return [url for url in urls if url.rstrip('/') != page_url.rstrip('/')]
+
+
+def detect_load_more(soup, page_url: str) -> Optional[str]:
+    """Find the endpoint behind a 'load more' button or a rel=next link"""
+    for element in soup.find_all(['a', 'button', 'div', 'span']):
+        classes = ' '.join(element.get('class') or [])
+        if not (LOAD_MORE_TEXT_RE.search(element.get_text(' ', strip=True)[:40]) or LOAD_MORE_CLASS_RE.search(classes)):
+            continue
+        for attr in LOAD_MORE_ATTRS + ('href',):
+            value = element.get(attr)
+            if isinstance(value, str) and value.strip() and not value.startswith(('#', 'javascript:')):
+                return urljoin(page_url, value.strip())
+
+    rel_next = soup.find(['a', 'link'], rel='next', href=True)
+    if rel_next:
+        return urljoin(page_url, rel_next['href'])
+    return None
+
+
+def _tag_signature(tag: Tag) -> Tuple[str, Tuple[str, ...]]:
+    classes = tag.get('class') or []
+    if isinstance(classes, str):
+        classes = classes.split()
+    return tag.name, tuple(sorted(classes))
+
+
+def _lines(text: str) -> List[str]:
+    return [' '.join(line.split()) for line in text.split('\n') if line.strip()]
+
+
+def _name_line(text: str) -> str:
+    """The first name-shaped line, so cards that lead with the role still key on the person"""
+    return next((line for line in _lines(text) if looks_like_name(line)), '')
+
+
+def learn_container_signature(soup, instances: Iterable[dict]) -> Optional[Tuple[str, Tuple[str, ...]]]:
+    """Find the tag/class signature of the person cards the user captured"""
+    # Name line -> the next couple of lines that the card must also contain
+    samples = {}
+    for instance in instances:
+        lines = _lines(instance.get('text', ''))
+        if lines:
+            samples[lines[0]] = lines[1:3]
+    if not samples:
+        return None
+
+    votes: Counter = Counter()
+    closeness: Dict[Tuple[str, Tuple[str, ...]], int] = {}
+    for string in soup.find_all(string=True):
+        name = ' '.join(string.split())
+        if name not in samples:
+            continue
+        depth = 0
+        for ancestor in string.parents:
+            depth += 1
+            if not isinstance(ancestor, Tag) or ancestor.name not in CONTAINER_TAGS:
+                continue
+            ancestor_text = ' '.join(ancestor.get_text(' ', strip=True).split())
+            if not all(line in ancestor_text for line in samples[name]):
+                continue
+            signature = _tag_signature(ancestor)
+            votes[signature] += 1
+            closeness[signature] = max(closeness.get(signature, -depth), -depth)
+            # Only the innermost container that holds the whole card counts
+            break
+
+    if not votes:
+        return None
+    # Most captured names covered, then the innermost container
+    return max(votes, key=lambda signature: (votes[signature], closeness[signature]))
+
+
+def extract_instances(soup, signature: Tuple[str, Tuple[str, ...]], page_url: str) -> List[dict]:
+    """Turn every element matching the signature into DataFormatter-style instance data"""
+    tag_name, classes = signature
+    matches = soup.find_all(tag_name, class_=list(classes)[0]) if classes else soup.find_all(tag_name)
+    instances = []
+    for element in matches:
+        if _tag_signature(element) != signature:
+            continue
+        for hidden in element.find_all(['script', 'style']):
+            hidden.decompose()
+        text = element.get_text('\n', strip=True)
+        links = []
+        for anchor in element.find_all('a', href=True):
+            href = canonicalize_url(anchor['href'], page_url)
+            if href.startswith(('http://', 'https://')) and {'href': href} not in links:
+                links.append({'href': href})
+        if text or links:
+            instances.append({'text': text, 'links': links})
+    return instances
+
+
+def _soup_from_json(body: str):
+    """Pull an HTML fragment and the next URL out of a JSON 'load more' response"""
+    try:
+        payload = json.loads(body)
+    except ValueError:
+        return None, None
+
+    next_url = None
+    fragments = []
+    if isinstance(payload, dict):
+        for key in JSON_NEXT_KEYS:
+            if isinstance(payload.get(key), str):
+                next_url = payload[key]
+                break
+        if next_url is None and isinstance(payload.get('links'), dict) and isinstance(payload['links'].get('next'), str):
+            next_url = payload['links']['next']
+        for key in JSON_HTML_KEYS:
+            value = payload.get(key)
+            if isinstance(value, str):
+                fragments.append(value)
+            elif isinstance(value, list):
+                fragments.extend(item for item in value if isinstance(item, str))
+    elif isinstance(payload, list):
+        fragments.extend(item for item in payload if isinstance(item, str))
+
+    return make_soup(''.join(fragments)), next_url
+
+
+def _person_identity(instance: dict) -> Tuple[str, Set[str], Set[str]]:
+    """(name key, LinkedIn keys, link keys) of an instance.
+
+    The name key is the name-shaped line, or the whole text when no line looks
+    like a name.
+    """
+    text = instance.get('text', '')
+    name = _name_line(text)
+    name_key = f"name:{name.lower()}" if name else f"text:{' '.join(_lines(text)).lower()}"
+    hrefs = [link.get('href', '') for link in instance.get('links', []) if link.get('href')]
+    linkedin = {url_key(href) for href in hrefs if is_linkedin_url(href)}
+    return name_key, linkedin, {url_key(href) for href in hrefs}
+
+
+def merge_instances(container: Dict[str, dict], new_instances: Iterable[dict]) -> Dict[str, dict]:
+    """Append new instances to a container, skipping people already present.
+
+    A shared LinkedIn link means the same person. A shared name key only does
+    when the two cards' links do not contradict it, i.e. one has no links or
+    they share one.
+    """
+    merged = dict(container)
+    seen_linkedin: Set[str] = set()
+    links_by_name: Dict[str, List[Set[str]]] = {}
+
+    def remember(name_key, linkedin, links):
+        seen_linkedin.update(linkedin)
+        links_by_name.setdefault(name_key, []).append(links)
+
+    for instance in merged.values():
+        remember(*_person_identity(instance))
+    next_number = max((int(key) for key in merged if str(key).isdigit()), default=0) + 1
+    for instance in new_instances:
+        name_key, linkedin, links = _person_identity(instance)
+        if name_key == 'text:' and not links:
+            continue
+        if linkedin & seen_linkedin:
+            continue
+        if any(not links or not other_links or links & other_links for other_links in links_by_name.get(name_key, [])):
+            logger.debug(f"Skipping duplicate card '{name_key}'")
+            continue
+        remember(name_key, linkedin, links)
+        merged[str(next_number)] = instance
+        next_number += 1
+    return merged
+
+
+def crawl_paginated_team(team_url: str, container: Dict[str, dict], max_pages: int = MAX_PAGES,
+                         max_workers: int = MAX_WORKERS, per_host_limit: Optional[int] = PER_HOST_LIMIT) -> Dict[str, dict]:
+    """Fetch the remaining pages of a team listing and merge their people into the container"""
+    first_page = make_request(team_url)
+    if not first_page:
+        return container
+
+    soup = make_soup(first_page)
+    signature = learn_container_signature(soup, container.values())
+    if not signature:
+        logger.warning(f"Could not locate the captured containers on {team_url}")
+        return container
+
+    limiter = HostLimiter(per_host_limit)
+    new_instances = extract_instances(soup, signature, team_url)
+
+    page_urls = detect_numbered_pages(soup, team_url, max_pages)
+    if page_urls:
+        logger.info(f"Fetching {len(page_urls)} additional pages for {team_url}")
+        for page_url, body in fetch_pages(page_urls, max_workers, limiter).items():
+            if body:
+                new_instances.extend(extract_instances(make_soup(body), signature, page_url))
+    else:
+        # 'Load more' endpoints only reveal the next URL once fetched, so follow them in turn
+        next_url = detect_load_more(soup, team_url)
+        seen_urls = {team_url}
+        while next_url and next_url not in seen_urls and len(seen_urls) <= max_pages:
+            seen_urls.add(next_url)
+            with limiter.slot(next_url):
+                body = make_request(next_url, allowed_content_types=PAGE_CONTENT_TYPES)
+            if not body:
+                break
+            page_soup, json_next = _soup_from_json(body)
+            if page_soup is None:
+                page_soup = make_soup(body)
+                following = detect_load_more(page_soup, next_url)
+            else:
+                following = urljoin(next_url, json_next) if json_next else None
+            page_instances = extract_instances(page_soup, signature, next_url)
+            if not page_instances:
+                break
+            new_instances.extend(page_instances)
+            next_url = following
+
+    merged = merge_instances(container, new_instances)
+    logger.info(f"Crawled {team_url}: {len(merged) - len(container)} new people added to {len(container)} captured")
+    return merged
@@ -0,0 +1,356 @@
+import hashlib
+import json
+import logging
+import os
+import random
+import statistics
+import threading
+import time
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from types import SimpleNamespace
+from typing import Callable, Dict, List, Optional
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+import helper_functions
+import response_1
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+DEFAULT_CASSETTE_DIR = os.getenv('FM_CASSETTE_DIR', 'cassettes')
+HTTP = 'http'
+LLM = 'llm'
+# Only headers that make_request looks at are kept in cassettes
+RECORDED_HEADERS = ('Content-Type', 'Content-Length', 'Retry-After')
+
+
+class CassetteMissError(LookupError):
+    """Raised in replay mode for a request that was never recorded"""
+
+
+class InjectedAPIError(Exception):
+    """Replayed LLM failure carrying an HTTP status, like openai.APIStatusError"""
+
+    def __init__(self, message: str, status_code: int):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+def http_key(url: str) -> str:
+    return hashlib.sha1(url.encode('utf-8')).hexdigest()
+
+
+def llm_key(request: dict) -> str:
+    payload = json.dumps({name: request.get(name) for name in ('model', 'messages', 'response_format')},
+                         sort_keys=True, ensure_ascii=False)
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+
+class CassetteStore:
+    """Directory of recorded responses, one JSON file per request under http/ and llm/"""
+
+    def __init__(self, path: str = DEFAULT_CASSETTE_DIR):
+        self.path = path
+        self._cache: Dict[tuple, dict] = {}
+        self._lock = threading.Lock()
+        for kind in (HTTP, LLM):
+            os.makedirs(os.path.join(path, kind), exist_ok=True)
+
+    def _file(self, kind: str, key: str) -> str:
+        return os.path.join(self.path, kind, f'{key}.json')
+
+    def get(self, kind: str, key: str) -> Optional[dict]:
+        with self._lock:
+            if (kind, key) in self._cache:
+                return self._cache[(kind, key)]
+        try:
+            with open(self._file(kind, key), encoding='utf-8') as f:
+                record = json.load(f)
+        except FileNotFoundError:
+            return None
+        with self._lock:
+            self._cache[(kind, key)] = record
+        return record
+
+    def put(self, kind: str, key: str, record: dict) -> None:
+        tmp_path = f'{self._file(kind, key)}.{threading.get_ident()}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(record, f, ensure_ascii=False)
+        os.replace(tmp_path, self._file(kind, key))
+        with self._lock:
+            self._cache[(kind, key)] = record
+
+    def latencies(self, kind: str) -> List[float]:
+        """All recorded latencies of one kind, for sampling a realistic distribution"""
+        values = []
+        for name in os.listdir(os.path.join(self.path, kind)):
+            if name.endswith('.json'):
+                record = self.get(kind, name[:-5])
+                if record:
+                    values.append(record['latency'])
+        return values
+
+
+class FaultProfile:
+    """Latency shaping and failure injection for replayed responses.
+
+    Rates are independent per-call probabilities. With sample_latency, each call
+    draws a latency from everything recorded of its kind instead of replaying the
+    latency recorded for that exact request.
+    """
+
+    def __init__(self, latency_scale: float = 1.0, sample_latency: bool = False, error_rate: float = 0.0,
+                 rate_limit_rate: float = 0.0, timeout_rate: float = 0.0, seed: Optional[int] = None):
+        self.latency_scale = latency_scale
+        self.sample_latency = sample_latency
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.timeout_rate = timeout_rate
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def latency(self, recorded: float, pool: List[float]) -> float:
+        with self._lock:
+            if self.sample_latency and pool:
+                recorded = self._random.choice(pool)
+        return recorded * self.latency_scale
+
+    def fault(self) -> Optional[str]:
+        """Pick 'rate_limit', 'error', 'timeout' or None for one call"""
+        with self._lock:
+            roll = self._random.random()
+        for name, rate in (('rate_limit', self.rate_limit_rate), ('error', self.error_rate),
+                           ('timeout', self.timeout_rate)):
+            if roll < rate:
+                return name
+            roll -= rate
+        return None
+
+
+def _percentile(values: List[float], fraction: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+class CallStats:
+    """Thread-safe latency and outcome log for recorded or replayed calls"""
+
+    def __init__(self):
+        self._latencies = defaultdict(list)
+        self._outcomes = defaultdict(Counter)
+        self._lock = threading.Lock()
+
+    def add(self, kind: str, latency: float, outcome: str) -> None:
+        with self._lock:
+            self._latencies[kind].append(latency)
+            self._outcomes[kind][outcome] += 1
+
+    def summary(self) -> Dict[str, dict]:
+        """Per kind: call count, outcome counts and latency mean/p50/p95/p99/max in seconds"""
+        with self._lock:
+            result = {}
+            for kind, latencies in self._latencies.items():
+                result[kind] = {
+                    'calls': len(latencies),
+                    'outcomes': dict(self._outcomes[kind]),
+                    'mean': statistics.fmean(latencies),
+                    'p50': _percentile(latencies, 0.50),
+                    'p95': _percentile(latencies, 0.95),
+                    'p99': _percentile(latencies, 0.99),
+                    'max': max(latencies),
+                }
+            return result
+
+
+class ReplayResponse:
+    """Just enough of requests.Response for make_request"""
+
+    def __init__(self, url: str, status_code: int, headers: dict, body: bytes):
+        self.url = url
+        self.status_code = status_code
+        self.headers = CaseInsensitiveDict(headers)
+        self.content = body
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.HTTPError(f"{self.status_code} Error for url: {self.url}", response=self)
+
+    def iter_content(self, chunk_size: int = 1):
+        for start in range(0, len(self.content), chunk_size):
+            yield self.content[start:start + chunk_size]
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def make_chat_client(create: Callable) -> SimpleNamespace:
+    """Object exposing client.chat.completions.create, which is all response_1 uses"""
+    return SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+
+
+def make_chat_response(content: str) -> SimpleNamespace:
+    return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))])
+
+
+class RecordingTransport:
+    """requests.get replacement that performs the real request and saves it to the store"""
+
+    def __init__(self, store: CassetteStore, stats: CallStats, get: Callable = requests.get,
+                 max_bytes: int = helper_functions.MAX_RESPONSE_BYTES):
+        self.store = store
+        self.stats = stats
+        self.get = get
+        self.max_bytes = max_bytes
+
+    def __call__(self, url: str, **kwargs) -> ReplayResponse:
+        start = time.perf_counter()
+        try:
+            with self.get(url, **kwargs) as response:
+                chunks, received = [], 0
+                for chunk in response.iter_content(chunk_size=helper_functions.DOWNLOAD_CHUNK_SIZE):
+                    chunks.append(chunk)
+                    received += len(chunk)
+                    if received >= self.max_bytes:
+                        break
+                body = b''.join(chunks)[:self.max_bytes]
+                status_code = response.status_code
+                headers = {name: response.headers[name] for name in RECORDED_HEADERS if name in response.headers}
+        except requests.RequestException:
+            self.stats.add(HTTP, time.perf_counter() - start, 'error')
+            raise
+        latency = time.perf_counter() - start
+        self.store.put(HTTP, http_key(url), {
+            'url': url,
+            'status_code': status_code,
+            'headers': headers,
+            'body': body.decode('latin-1'),
+            'latency': latency,
+        })
+        self.stats.add(HTTP, latency, str(status_code))
+        return ReplayResponse(url, status_code, headers, body)
+
+
+class ReplayTransport:
+    """requests.get replacement that serves recorded responses with injected latency and faults"""
+
+    def __init__(self, store: CassetteStore, stats: CallStats, faults: Optional[FaultProfile] = None):
+        self.store = store
+        self.stats = stats
+        self.faults = faults or FaultProfile()
+        self._pool = store.latencies(HTTP) if self.faults.sample_latency else []
+
+    def __call__(self, url: str, **kwargs) -> ReplayResponse:
+        record = self.store.get(HTTP, http_key(url))
+        if record is None:
+            self.stats.add(HTTP, 0.0, 'miss')
+            raise requests.ConnectionError(f"No cassette recorded for {url}")
+
+        latency = self.faults.latency(record['latency'], self._pool)
+        fault = self.faults.fault()
+        time.sleep(latency)
+        if fault == 'timeout':
+            self.stats.add(HTTP, latency, 'timeout')
+            raise requests.Timeout(f"Injected timeout for {url}")
+        if fault == 'rate_limit':
+            self.stats.add(HTTP, latency, '429')
+            return ReplayResponse(url, 429, {'Retry-After': '1'}, b'')
+        if fault == 'error':
+            self.stats.add(HTTP, latency, '503')
+            return ReplayResponse(url, 503, {}, b'')
+        self.stats.add(HTTP, latency, str(record['status_code']))
+        return ReplayResponse(url, record['status_code'], record['headers'], record['body'].encode('latin-1'))
+
+
+class RecordingChatClient:
+    """Wraps a real OpenAI client and saves each chat completion to the store"""
+
+    def __init__(self, store: CassetteStore, stats: CallStats, client):
+        self.store = store
+        self.stats = stats
+        self.client = client
+        self.chat = make_chat_client(self.create).chat
+
+    def create(self, **kwargs):
+        start = time.perf_counter()
+        try:
+            response = self.client.chat.completions.create(**kwargs)
+        except Exception:
+            self.stats.add(LLM, time.perf_counter() - start, 'error')
+            raise
+        latency = time.perf_counter() - start
+        content = response.choices[0].message.content
+        self.store.put(LLM, llm_key(kwargs), {'request': kwargs, 'content': content, 'latency': latency})
+        self.stats.add(LLM, latency, 'ok')
+        return response
+
+
+class ReplayChatClient:
+    """Serves recorded chat completions with injected latency and faults"""
+
+    def __init__(self, store: CassetteStore, stats: CallStats, faults: Optional[FaultProfile] = None):
+        self.store = store
+        self.stats = stats
+        self.faults = faults or FaultProfile()
+        self._pool = store.latencies(LLM) if self.faults.sample_latency else []
+        self.chat = make_chat_client(self.create).chat
+
+    def create(self, **kwargs):
+        record = self.store.get(LLM, llm_key(kwargs))
+        if record is None:
+            self.stats.add(LLM, 0.0, 'miss')
+            raise CassetteMissError("No cassette recorded for this chat completion request")
+
+        latency = self.faults.latency(record['latency'], self._pool)
+        fault = self.faults.fault()
+        time.sleep(latency)
+        if fault == 'rate_limit':
+            self.stats.add(LLM, latency, '429')
+            raise InjectedAPIError("Injected rate limit", 429)
+        if fault == 'error':
+            self.stats.add(LLM, latency, '503')
+            raise InjectedAPIError("Injected server error", 503)
+        if fault == 'timeout':
+            self.stats.add(LLM, latency, 'timeout')
+            raise TimeoutError("Injected request timeout")
+        self.stats.add(LLM, latency, 'ok')
+        return make_chat_response(record['content'])
+
+
+@contextmanager
+def cassette(mode: str, path: str = DEFAULT_CASSETTE_DIR, faults: Optional[FaultProfile] = None,
+             http_get: Callable = requests.get, openai_client=None):
+    """Record or replay every make_request and response_1 OpenAI call made inside the block.
+
+    Yields the CallStats for the block. In record mode http_get and openai_client
+    are the real upstreams (defaults: requests.get and setup_openai()).
+    """
+    store = CassetteStore(path)
+    stats = CallStats()
+    if mode == 'record':
+        transport = RecordingTransport(store, stats, get=http_get)
+        chat_client = RecordingChatClient(store, stats, openai_client or response_1.setup_openai())
+    elif mode == 'replay':
+        transport = ReplayTransport(store, stats, faults)
+        chat_client = ReplayChatClient(store, stats, faults)
+    else:
+        raise ValueError(f"Unknown cassette mode '{mode}', expected 'record' or 'replay'")
+
+    previous_transport = helper_functions.set_http_transport(transport)
+    previous_factory = response_1.set_openai_client_factory(lambda: chat_client)
+    logger.info(f"Cassette {mode} mode using {path}")
+    try:
+        yield stats
+    finally:
+        helper_functions.set_http_transport(previous_transport)
+        response_1.set_openai_client_factory(previous_factory)
@@ -5,19 +5,71 @@ import logging
 from dotenv import load_dotenv
 import os
 from urllib.parse import urlparse
+from adaptive_concurrency import llm_concurrency
+from url_canonical import canonicalize_url
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+MODEL = "gpt-4o-mini"
+
+# Field schema shared by both prompts so the instructions stay byte-identical across calls
+FIELD_SCHEMA = """Main key "employees". Sub-keys:
+- 'Main_URL': the Main_URL given with the data
+- 'Name': the individual's name
+- 'Title': their organizational title
+- 'LinkedIn Profile Link': a valid URL containing "linkedin.com"
+- 'Individual profile URLs': a unique URL for the individual; empty if invalid
+- 'Bio': a brief description of the individual
+- 'Sector Expertise': summarize the sector expertise from 'Bio' (e.g. "Cloud Computing", "Marketing")
+- 'Additional Information'
+- 'Additional Links'
+Use an empty string for any field that is missing or cannot be determined."""
+
+# Fixed system prompts: everything that does not depend on the request comes first,
+# so provider-side prompt caching can reuse the prefix between calls
+LISTING_SYSTEM_PROMPT = f"""You are a JSON-only assistant that structures raw employee data.
+Do not skip any data: if there are 100 employees, return all 100 as a list under "employees".
+{FIELD_SCHEMA}"""
+
+PROFILE_SYSTEM_PROMPT = f"""You are a JSON-only assistant that structures raw employee data.
+All the data describes a single employee; return one object under "employees".
+{FIELD_SCHEMA}"""
+
+
+def compact_json(data) -> str:
+    """Serialize without indentation or padding whitespace"""
+    return json.dumps(data, ensure_ascii=False, separators=(',', ':'))
+
+
+def build_messages(system_prompt: str, element_data, url: str) -> list:
+    """Fixed system prompt first, then only the per-request URL and data"""
+    return [
+        {"role": "system", "content": system_prompt},
+        {"role": "user", "content": f"Main_URL: {url}\nRaw data:\n{compact_json(element_data)}"}
+    ]
+
+# Zero-argument callable returning a client; swapped out by the record/replay harness
+_client_factory = None
+
+def set_openai_client_factory(factory=None):
+    """Make setup_openai return clients from factory (None restores the real client), returning the previous one"""
+    global _client_factory
+    previous = _client_factory
+    _client_factory = factory
+    return previous
+
 def setup_openai():
     """Initialize OpenAI client"""
+    if _client_factory is not None:
+        return _client_factory()
     load_dotenv()
     return OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
 
 def format_url(url):
     """Format and validate URL to ensure proper scheme"""
     try:
-        url = url.strip()
+        url = canonicalize_url(url)
         parsed = urlparse(url)
         
         if not parsed.scheme:
@@ -34,42 +86,15 @@ def process_element_with_gpt(element_data, url):
     url = format_url(url)
     client = setup_openai()
     base_url = str("/".join(url.split("/")[:-1]))
-    prompt = """
-    Instructions:
-    1. Do not skip any data. If there are 100 results, return all 100.
-    2. You are a JSON-only response bot, specialized in processing employee data.
-
-    Please analyze the provided data and structure it in the following format:
-    Main Key will be "employees":
-    Below are the sub-keys
-        - 'Main_URL': {url}
-        - 'Name': The name of the individual.
-        - 'Title': Their organizational title.
-        - 'LinkedIn Profile Link': A valid LinkedIn URL containing "linkedin.com". If absent, return an empty string.
-        - 'Individual profile URLs': A unique URL associated with the individual. If absent or invalid, return an empty string.
-        - 'Bio': A brief description of the individual. If absent, return an empty string.
-        - 'Sector Expertise': Based on 'Bio', summarize the individual's sector expertise (e.g., "Cloud Computing", "Marketing").
-        - 'Additional Information'
-        - 'Additional Links'
-
-    If a field is missing or cannot be determined, return it as an empty string.
-
-    Raw data:
-    {data}
-
-    """
-
     # - If the link contains the substring "{url}", ensure it is captured.
     
     try:
-        response = client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[
-                {"role": "system", "content": "You are a data structuring assistant. Convert the provided raw data into a consistent JSON format."},
-                {"role": "user", "content": prompt.format(data=json.dumps(element_data, indent=2), url = url)}
-            ],
-            response_format={"type": "json_object"}
-        )
+        with llm_concurrency.track(MODEL):
+            response = client.chat.completions.create(
+                model=MODEL,
+                messages=build_messages(LISTING_SYSTEM_PROMPT, element_data, url),
+                response_format={"type": "json_object"}
+            )
         
         result = json.loads(response.choices[0].message.content)
         
@@ -86,48 +111,29 @@ def process_element_with_gpt(element_data, url):
         logger.error(f"Error in GPT processing: {e}")
         return None
 
+def normalize_profile_result(result: dict) -> dict:
+    """Wrap the single employee of a profile response in a one-item 'employees' list"""
+    employees = result['employees']
+    if isinstance(employees, list):
+        employees = employees[0] if employees else {}
+    result['employees'] = [dict(employees)]
+    return result
+
 def process_element_with_gpt_2(element_data, url):
     """Process a single element with GPT"""
     print("Gettig Response 2")
     url = format_url(url)
     client = setup_openai()
     base_url = str("/".join(url.split("/")[:-1]))
-    prompt = """
-    Instructions:
-    1. Remember the whole data is with respect to only a single employee.
-    2. You are a JSON-only response bot, specialized in processing employee data.
-
-    Please analyze the provided data and structure it in the following format:
-    Main Key will be "employees":
-    Below are the sub-keys
-        - 'Main_URL'
-        - 'Name': The name of the individual.
-        - 'Title': Their organizational title.
-        - 'LinkedIn Profile Link': A valid LinkedIn URL containing "linkedin.com". If absent, return an empty string.
-        - 'Individual profile URLs': A unique URL associated with the individual. If absent or invalid, return an empty string.
-        - 'Bio': A brief description of the individual. If absent, return an empty string.
-        - 'Sector Expertise': Based on 'Bio', summarize the individual's sector expertise (e.g., "Cloud Computing", "Marketing").
-        - 'Additional Information': Return empty string if nothing is found
-        - 'Additional Links': Return empty string if nothing is found
-
-    If a field is missing or cannot be determined, return it as an empty string.
-
-    Raw data:
-    {data}
-
-    """
-
     # - If the link contains the substring "{url}", ensure it is captured.
     
     try:
-        response = client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[
-                {"role": "system", "content": "You are a data structuring assistant. Convert the provided raw data into a consistent JSON format."},
-                {"role": "user", "content": prompt.format(data=element_data, url = url)}
-            ],
-            response_format={"type": "json_object"}
-        )
+        with llm_concurrency.track(MODEL):
+            response = client.chat.completions.create(
+                model=MODEL,
+                messages=build_messages(PROFILE_SYSTEM_PROMPT, element_data, url),
+                response_format={"type": "json_object"}
+            )
         
         result = json.loads(response.choices[0].message.content)
         
@@ -138,8 +144,7 @@ def process_element_with_gpt_2(element_data, url):
                     employee['Individual profile URLs'] = str(employee['Individual profile URLs'])
                 elif employee['Individual profile URLs'] == url or len(str(employee['Individual profile URLs']) < len(str(url))) or employee['Individual profile URLs'] == str(base_url) + "/":
                     employee['Individual profile URLs'] = '''''
-        result['employees'] = [dict(result['employees'])]
-        return result
+        return normalize_profile_result(result)
         
     except Exception as e:
         logger.error(f"Error in GPT processing: {e}")
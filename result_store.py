@@ -0,0 +1,202 @@
+import json
+import logging
+import os
+import sqlite3
+import tempfile
+import threading
+from typing import Dict, Iterator, List, Optional
+
+from url_canonical import is_linkedin_url, url_key
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+DEFAULT_PAGE_SIZE = 1000
+
+
+def make_dedup_key(employee: dict, firm_url: str = "") -> str:
+    """Build a key identifying the same person across firms and runs"""
+    linkedin = str(employee.get('LinkedIn Profile Link', '') or '')
+    if is_linkedin_url(linkedin):
+        return f"linkedin:{url_key(linkedin)}"
+
+    profile_url = url_key(str(employee.get('Individual profile URLs', '') or ''))
+    if profile_url:
+        return f"profile:{profile_url}"
+
+    name = ' '.join(str(employee.get('Name', '') or '').lower().split())
+    firm = url_key(str(employee.get('Main_URL', '') or firm_url))
+    return f"name:{firm}|{name}"
+
+
+class ResultStore:
+    """SQLite-backed store that stages employee rows on disk as they complete.
+
+    Without a path (argument or FM_RESULT_STORE_PATH) the store lives in a
+    temporary file that is deleted on close.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        if path is None:
+            path = os.getenv("FM_RESULT_STORE_PATH")
+        self.temporary = not path
+        if self.temporary:
+            fd, path = tempfile.mkstemp(prefix="fm_results_", suffix=".sqlite3")
+            os.close(fd)
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS rows (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                firm_url TEXT NOT NULL DEFAULT '',
+                dedup_key TEXT NOT NULL,
+                data TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_rows_dedup ON rows (dedup_key);
+            CREATE INDEX IF NOT EXISTS idx_rows_firm ON rows (firm_url);
+            CREATE TABLE IF NOT EXISTS columns (
+                position INTEGER PRIMARY KEY AUTOINCREMENT,
+                name TEXT NOT NULL UNIQUE
+            );
+        """)
+        self._conn.commit()
+
+    def append(self, employee: dict, firm_url: str = "") -> None:
+        """Stage a single completed employee row"""
+        self.append_many([employee], firm_url)
+
+    def append_many(self, employees: List[dict], firm_url: str = "") -> None:
+        """Stage several completed employee rows in one transaction"""
+        rows = []
+        column_names = []
+        for employee in employees:
+            if not isinstance(employee, dict):
+                logger.error(f"Skipping non-dict row of type {type(employee)}")
+                continue
+            rows.append((firm_url, make_dedup_key(employee, firm_url), json.dumps(employee)))
+            column_names.extend((name,) for name in employee.keys())
+
+        if not rows:
+            return
+
+        with self._lock:
+            self._conn.executemany("INSERT OR IGNORE INTO columns (name) VALUES (?)", column_names)
+            self._conn.executemany("INSERT INTO rows (firm_url, dedup_key, data) VALUES (?, ?, ?)", rows)
+            self._conn.commit()
+
+    def columns(self) -> List[str]:
+        """Return every column seen so far, in first-seen order"""
+        with self._lock:
+            cursor = self._conn.execute("SELECT name FROM columns ORDER BY position")
+            return [row[0] for row in cursor.fetchall()]
+
+    def count(self, dedupe: bool = False, firm_url: Optional[str] = None) -> int:
+        """Count staged rows, optionally collapsing duplicates"""
+        where, params = self._where(firm_url)
+        if dedupe:
+            query = f"SELECT COUNT(DISTINCT dedup_key) FROM rows {where}"
+        else:
+            query = f"SELECT COUNT(*) FROM rows {where}"
+        with self._lock:
+            return self._conn.execute(query, params).fetchone()[0]
+
+    def firms(self) -> List[str]:
+        """Return the firm URLs that have rows in the store"""
+        with self._lock:
+            cursor = self._conn.execute("SELECT DISTINCT firm_url FROM rows ORDER BY firm_url")
+            return [row[0] for row in cursor.fetchall()]
+
+    def duplicates(self) -> Dict[str, List[str]]:
+        """Map each dedup key seen more than once to the firms it appeared under"""
+        query = """
+            SELECT dedup_key, GROUP_CONCAT(DISTINCT firm_url) FROM rows
+            GROUP BY dedup_key HAVING COUNT(*) > 1
+        """
+        with self._lock:
+            cursor = self._conn.execute(query)
+            return {key: (firms or '').split(',') for key, firms in cursor.fetchall()}
+
+    def page(self, offset: int = 0, limit: int = DEFAULT_PAGE_SIZE,
+             dedupe: bool = False, firm_url: Optional[str] = None) -> List[dict]:
+        """Return one page of rows as dicts"""
+        query, params = self._select(dedupe, firm_url)
+        with self._lock:
+            cursor = self._conn.execute(f"{query} LIMIT ? OFFSET ?", params + [limit, offset])
+            return [json.loads(row[1]) for row in cursor.fetchall()]
+
+    def iter_pages(self, page_size: int = DEFAULT_PAGE_SIZE, dedupe: bool = False,
+                   firm_url: Optional[str] = None) -> Iterator[List[dict]]:
+        """Yield rows a page at a time without loading the whole result set"""
+        query, params = self._select(dedupe, firm_url)
+        last_id = 0
+        while True:
+            keyed = f"SELECT id, data FROM ({query}) WHERE id > ? ORDER BY id LIMIT ?"
+            with self._lock:
+                fetched = self._conn.execute(keyed, params + [last_id, page_size]).fetchall()
+            if not fetched:
+                return
+            last_id = fetched[-1][0]
+            yield [json.loads(data) for _, data in fetched]
+
+    def iter_rows(self, page_size: int = DEFAULT_PAGE_SIZE, dedupe: bool = False,
+                  firm_url: Optional[str] = None) -> Iterator[dict]:
+        """Yield rows one at a time, fetched from disk in pages"""
+        for page in self.iter_pages(page_size, dedupe, firm_url):
+            yield from page
+
+    def iter_values(self, columns: Optional[List[str]] = None, page_size: int = DEFAULT_PAGE_SIZE,
+                    dedupe: bool = False, firm_url: Optional[str] = None) -> Iterator[List[List[str]]]:
+        """Yield pages of rows as lists of strings aligned to columns, ready for a sheet writer"""
+        columns = columns or self.columns()
+        for page in self.iter_pages(page_size, dedupe, firm_url):
+            yield [[_to_cell(row.get(column)) for column in columns] for row in page]
+
+    def clear(self, firm_url: Optional[str] = None) -> None:
+        """Drop all staged rows, or only those of one firm"""
+        with self._lock:
+            if firm_url is None:
+                self._conn.execute("DELETE FROM rows")
+                self._conn.execute("DELETE FROM columns")
+            else:
+                self._conn.execute("DELETE FROM rows WHERE firm_url = ?", [firm_url])
+            self._conn.commit()
+
+    def close(self) -> None:
+        """Close the underlying database connection, deleting the file if it is temporary"""
+        with self._lock:
+            self._conn.close()
+            if self.temporary:
+                for suffix in ("", "-wal", "-shm"):
+                    try:
+                        os.remove(self.path + suffix)
+                    except FileNotFoundError:
+                        pass
+
+    def _where(self, firm_url: Optional[str]):
+        if firm_url is None:
+            return "", []
+        return "WHERE firm_url = ?", [firm_url]
+
+    def _select(self, dedupe: bool, firm_url: Optional[str]):
+        where, params = self._where(firm_url)
+        if dedupe:
+            # Keep the most recent row for each person
+            query = f"""
+                SELECT id, data FROM rows WHERE id IN (
+                    SELECT MAX(id) FROM rows {where} GROUP BY dedup_key
+                ) ORDER BY id
+            """
+        else:
+            query = f"SELECT id, data FROM rows {where} ORDER BY id"
+        return query, params
+
+
+def _to_cell(value) -> str:
+    if value is None:
+        return ""
+    if isinstance(value, float) and value != value:
+        return ""
+    return str(value)
@@ -0,0 +1,272 @@
+import gzip
+import io
+import logging
+import re
+import threading
+import unicodedata
+import xml.etree.ElementTree as ET
+from collections import OrderedDict
+from typing import Dict, Iterable, Iterator, List, Set, Tuple
+from urllib.parse import urljoin, urlparse
+
+from requests.exceptions import RequestException
+
+import helper_functions
+from helper_functions import DOWNLOAD_CHUNK_SIZE, REQUEST_HEADERS, REQUEST_TIMEOUT, get_base_url, make_request
+from url_canonical import host_key
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+DEFAULT_SITEMAP_PATHS = ('/sitemap.xml', '/sitemap_index.xml')
+MAX_SITEMAP_DEPTH = 3
+MAX_SITEMAP_BYTES = 50 * 1024 * 1024  # sitemap protocol limit, uncompressed
+MAX_SITEMAP_URLS = 200000
+GZIP_MAGIC = b'\x1f\x8b'
+DISCOVERY_CACHE_SIZE = 64
+
+# Path segments that usually sit directly above an individual profile slug
+PROFILE_PATH_HINTS = {
+    'team', 'our-team', 'the-team', 'people', 'our-people', 'professionals', 'leadership',
+    'partners', 'staff', 'person', 'bio', 'bios', 'members', 'who-we-are', 'about-us', 'management',
+}
+NAME_STOPWORDS = {'dr', 'mr', 'mrs', 'ms', 'prof', 'sir', 'jr', 'sr', 'ii', 'iii', 'phd', 'cfa', 'cpa', 'mba'}
+
+
+class _ChunkReader(io.RawIOBase):
+    """File-like view of an iterator of byte chunks, e.g. response.iter_content()"""
+
+    def __init__(self, chunks: Iterator[bytes]):
+        self._chunks = chunks
+        self._pending = b''
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        while not self._pending:
+            self._pending = next(self._chunks, None)
+            if self._pending is None:
+                self._pending = b''
+                return 0
+        data, self._pending = self._pending[:len(buffer)], self._pending[len(buffer):]
+        buffer[:len(data)] = data
+        return len(data)
+
+
+class _LimitedReader(io.RawIOBase):
+    """File-like wrapper that stops reading after a byte budget"""
+
+    def __init__(self, stream, limit: int):
+        self._stream = stream
+        self._remaining = limit
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        if self._remaining <= 0:
+            raise IOError("Sitemap exceeds the maximum allowed size")
+        data = self._stream.read(min(len(buffer), self._remaining))
+        self._remaining -= len(data)
+        buffer[:len(data)] = data
+        return len(data)
+
+
+def _local_name(tag: str) -> str:
+    return tag.rsplit('}', 1)[-1]
+
+
+def iter_sitemap_entries(sitemap_url: str) -> Iterator[Tuple[str, str]]:
+    """Stream a sitemap and yield ('sitemap' | 'url', loc) pairs as they are parsed.
+
+    Fetched through make_request's transport and the site's adaptive limiter.
+    """
+    try:
+        with helper_functions.host_concurrency.track(host_key(sitemap_url)), \
+                helper_functions._http_get(sitemap_url, headers=REQUEST_HEADERS, timeout=REQUEST_TIMEOUT,
+                                           stream=True) as response:
+            response.raise_for_status()
+            # iter_content undoes Content-Encoding; .gz files are handled below
+            chunks = _ChunkReader(response.iter_content(chunk_size=DOWNLOAD_CHUNK_SIZE))
+            stream = io.BufferedReader(_LimitedReader(chunks, MAX_SITEMAP_BYTES))
+            if stream.peek(2)[:2] == GZIP_MAGIC:
+                # The size limit applies to the decompressed sitemap too
+                stream = io.BufferedReader(_LimitedReader(gzip.GzipFile(fileobj=stream), MAX_SITEMAP_BYTES))
+
+            for _, element in ET.iterparse(stream, events=('end',)):
+                name = _local_name(element.tag)
+                if name in ('sitemap', 'url'):
+                    loc = next((child.text for child in element if _local_name(child.tag) == 'loc'), None)
+                    if loc and loc.strip():
+                        yield name, loc.strip()
+                    element.clear()
+    except (RequestException, ET.ParseError, IOError, EOFError) as e:
+        logger.error(f"Failed to read sitemap {sitemap_url}: {str(e)}")
+
+
+def iter_sitemap_urls(sitemap_urls: Iterable[str], max_depth: int = MAX_SITEMAP_DEPTH) -> Iterator[str]:
+    """Yield page URLs from sitemaps, following nested sitemap indexes once each"""
+    pending = [(url, 0) for url in sitemap_urls]
+    seen: Set[str] = set()
+    while pending:
+        sitemap_url, depth = pending.pop(0)
+        if sitemap_url in seen:
+            continue
+        seen.add(sitemap_url)
+
+        for kind, loc in iter_sitemap_entries(sitemap_url):
+            if kind == 'url':
+                yield loc
+            elif depth < max_depth:
+                pending.append((loc, depth + 1))
+
+
+def find_sitemaps(base_url: str) -> List[str]:
+    """List sitemap URLs declared in robots.txt, falling back to the usual locations"""
+    sitemaps = []
+    robots = make_request(urljoin(base_url, '/robots.txt'))
+    if robots:
+        for line in robots.splitlines():
+            key, _, value = line.partition(':')
+            if key.strip().lower() == 'sitemap' and value.strip():
+                sitemaps.append(value.strip())
+
+    if not sitemaps:
+        sitemaps = [urljoin(base_url, path) for path in DEFAULT_SITEMAP_PATHS]
+    return sitemaps
+
+
+def _path_segments(url: str) -> List[str]:
+    return [segment for segment in urlparse(url).path.lower().split('/') if segment]
+
+
+def filter_profile_urls(urls: Iterable[str], team_url: str) -> List[str]:
+    """Keep URLs on the team page's host that look like individual profile pages"""
+    team_host = host_key(team_url)
+    team_segments = _path_segments(team_url)
+    under_team, hinted = [], []
+
+    for url in urls:
+        if host_key(url) != team_host:
+            continue
+        segments = _path_segments(url)
+        if team_segments and len(segments) == len(team_segments) + 1 and segments[:-1] == team_segments:
+            under_team.append(url)
+        elif len(segments) >= 2 and segments[-2] in PROFILE_PATH_HINTS:
+            hinted.append(url)
+
+    # Prefer pages directly under the team URL; otherwise accept /people/<slug>-style paths
+    return under_team or hinted
+
+
+def _ascii_tokens(text: str) -> List[str]:
+    folded = unicodedata.normalize('NFKD', text).encode('ascii', 'ignore').decode('ascii').lower()
+    return re.findall(r'[a-z0-9]+', folded)
+
+
+def _name_tokens(name: str) -> List[str]:
+    return [token for token in _ascii_tokens(name) if token not in NAME_STOPWORDS]
+
+
+def _slug_tokens(url: str) -> List[str]:
+    segments = _path_segments(url)
+    if not segments:
+        return []
+    slug = re.sub(r'\.(html?|php|aspx?)$', '', segments[-1])
+    return _ascii_tokens(slug)
+
+
+def match_profile_urls(names: Iterable[str], profile_urls: Iterable[str]) -> Dict[str, str]:
+    """Match employee names to profile URLs by their slugs in one pass over each list"""
+    by_token: Dict[str, List[Tuple[str, Set[str]]]] = {}
+    by_joined: Dict[str, List[str]] = {}
+    for url in profile_urls:
+        tokens = _slug_tokens(url)
+        if not tokens:
+            continue
+        token_set = set(tokens)
+        for token in token_set:
+            by_token.setdefault(token, []).append((url, token_set))
+        by_joined.setdefault(''.join(tokens), []).append(url)
+
+    matches = {}
+    for name in names:
+        tokens = _name_tokens(name)
+        if len(tokens) < 2:
+            continue
+        first, last = tokens[0], tokens[-1]
+        name_set = set(tokens)
+
+        # Rank: every name token in the slug, then first + last, then fewest extra tokens
+        ranked = []
+        for url, slug_set in by_token.get(last, []):
+            if name_set <= slug_set:
+                ranked.append((0, len(slug_set - name_set), url))
+            elif first in slug_set:
+                ranked.append((1, len(slug_set - name_set), url))
+        for joined in (first + last, ''.join(tokens), first[0] + last):
+            ranked.extend((2, 0, url) for url in by_joined.get(joined, []))
+
+        if not ranked:
+            continue
+        ranked.sort()
+        best = ranked[0]
+        ties = {url for rank, extra, url in ranked if (rank, extra) == best[:2]}
+        if len(ties) > 1:
+            logger.info(f"Ambiguous sitemap match for '{name}': {sorted(ties)}")
+            continue
+        matches[name] = best[2]
+
+    return matches
+
+
+_discovery_cache: "OrderedDict[str, Tuple[str, ...]]" = OrderedDict()
+_discovery_cache_lock = threading.Lock()
+
+
+def discover_profile_urls(team_url: str) -> Tuple[str, ...]:
+    """Fetch the site's sitemaps once and return candidate profile URLs for the team page.
+
+    Empty results are not cached, so a sitemap that failed to load is retried next time.
+    """
+    with _discovery_cache_lock:
+        if team_url in _discovery_cache:
+            _discovery_cache.move_to_end(team_url)
+            return _discovery_cache[team_url]
+
+    sitemaps = find_sitemaps(get_base_url(team_url))
+    urls = []
+    for i, url in enumerate(iter_sitemap_urls(sitemaps)):
+        if i >= MAX_SITEMAP_URLS:
+            logger.warning(f"Stopped reading sitemaps for {team_url} after {MAX_SITEMAP_URLS} URLs")
+            break
+        urls.append(url)
+
+    profile_urls = filter_profile_urls(urls, team_url)
+    logger.info(f"Sitemaps for {team_url}: {len(urls)} URLs, {len(profile_urls)} profile candidates")
+    if profile_urls:
+        with _discovery_cache_lock:
+            _discovery_cache[team_url] = tuple(profile_urls)
+            while len(_discovery_cache) > DISCOVERY_CACHE_SIZE:
+                _discovery_cache.popitem(last=False)
+    return tuple(profile_urls)
+
+
+def fill_missing_profile_urls(employees: List[dict], team_url: str) -> int:
+    """Fill empty 'Individual profile URLs' from the site's sitemaps, returning how many were filled"""
+    missing = [employee for employee in employees
+               if isinstance(employee, dict) and employee.get('Name') and not employee.get('Individual profile URLs')]
+    if not missing or not team_url:
+        return 0
+
+    profile_urls = discover_profile_urls(team_url)
+    if not profile_urls:
+        return 0
+
+    matches = match_profile_urls([employee['Name'] for employee in missing], profile_urls)
+    for employee in missing:
+        if employee['Name'] in matches:
+            employee['Individual profile URLs'] = matches[employee['Name']]
+    logger.info(f"Resolved {len(matches)}/{len(missing)} missing profile URLs from sitemaps")
+    return len(matches)
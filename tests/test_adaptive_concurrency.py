@@ -0,0 +1,69 @@
+import statistics
+import threading
+import time
+
+from adaptive_concurrency import ConcurrencyController
+from benchmarks.bench_adaptive_concurrency import SimulatedServer
+from record_replay import InjectedAPIError
+
+
+def test_sequential_calls_do_not_raise_the_limit():
+    controller = ConcurrencyController(initial_limit=4, max_limit=64)
+    for _ in range(150):
+        with controller.track('firm.example'):
+            pass
+
+    assert controller.metrics()['firm.example']['limit'] == 4
+
+
+def test_concurrent_demand_raises_the_limit():
+    controller = ConcurrencyController(initial_limit=4, max_limit=64)
+
+    def worker():
+        for _ in range(20):
+            with controller.track('firm.example'):
+                time.sleep(0.002)
+
+    threads = [threading.Thread(target=worker) for _ in range(16)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert controller.metrics()['firm.example']['limit'] > 4
+
+
+def test_limit_follows_a_simulated_server_with_shifting_capacity():
+    capacities, phase_seconds = (8, 2, 16), 1.0
+    controller = ConcurrencyController(initial_limit=4, max_limit=64)
+    server = SimulatedServer(capacities, phase_seconds, base_latency=0.01)
+    end = server.started + phase_seconds * len(capacities)
+    limits = [[] for _ in capacities]
+
+    def worker():
+        while time.monotonic() < end:
+            try:
+                with controller.track('firm.example'):
+                    if not server.handle():
+                        raise InjectedAPIError("Simulated overload", 503)
+            except InjectedAPIError:
+                pass
+
+    def monitor():
+        while time.monotonic() < end:
+            # Skip the first half of each phase while the limit adapts
+            if (time.monotonic() - server.started) % phase_seconds > phase_seconds / 2:
+                limits[server.phase()].append(controller.metrics()['firm.example']['limit'])
+            time.sleep(0.01)
+
+    threads = [threading.Thread(target=worker) for _ in range(32)] + [threading.Thread(target=monitor)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    high, low, regrown = (statistics.fmean(phase) for phase in limits)
+    assert low < high
+    assert low <= 2 * capacities[1]
+    assert regrown > low
+    assert regrown > capacities[1] * 2
@@ -0,0 +1,148 @@
+import json
+
+import pytest
+
+import helper_functions
+from batch_mode import (LocalFileBatchBackend, extract_listing, load_containers, run_bulk_enrichment,
+                        select_container)
+from record_replay import ReplayResponse
+
+PAGES = {
+    "https://firm.example/team/jane-doe": (
+        "<html><body><nav>Home Team</nav><div class='bio'><h1>Jane Doe</h1>"
+        "<p>Partner. Jane leads the private equity practice.</p></div></body></html>"
+    ),
+    "https://firm.example/team/john-smith": (
+        "<html><body><div class='bio'><h1>John Smith</h1>"
+        "<p>Associate. John works on fund formation.</p></div></body></html>"
+    ),
+}
+
+
+def title_responder(body):
+    """Answer like the model: echo Main_URL and read the title from the prompt"""
+    user_message = body['messages'][-1]['content']
+    main_url = user_message.split('\n', 1)[0].replace('Main_URL:', '').strip()
+    title = 'Partner' if 'Partner' in user_message else 'Associate'
+    return json.dumps({"employees": {"Main_URL": main_url, "Title": title, "Bio": user_message[-40:]}})
+
+
+@pytest.fixture(autouse=True)
+def fake_http():
+    def get(url, **kwargs):
+        if url not in PAGES:
+            return ReplayResponse(url, 404, {'Content-Type': 'text/html'}, b'')
+        return ReplayResponse(url, 200, {'Content-Type': 'text/html; charset=utf-8'}, PAGES[url].encode('utf-8'))
+
+    previous = helper_functions.set_http_transport(get)
+    yield
+    helper_functions.set_http_transport(previous)
+
+
+def employees():
+    return [
+        {'Name': 'Jane Doe', 'Title': '', 'Main_URL': 'https://firm.example/team',
+         'Individual profile URLs': 'https://firm.example/team/jane-doe?utm_source=x'},
+        {'Name': 'John Smith', 'Title': '', 'Main_URL': 'https://firm.example/team',
+         'Individual profile URLs': '/team/john-smith'},
+        {'Name': 'No Profile', 'Title': 'Counsel', 'Main_URL': 'https://firm.example/team'},
+    ]
+
+
+def test_offline_enrichment_merges_results_by_custom_id(tmp_path):
+    backend = LocalFileBatchBackend(str(tmp_path / 'backend'), responder=title_responder)
+
+    enriched = run_bulk_enrichment(employees(), backend, str(tmp_path / 'work'), poll_interval=0)
+
+    assert [employee['Title'] for employee in enriched] == ['Partner', 'Associate', 'Counsel']
+    assert enriched[0]['Individual profile URLs'] == 'https://firm.example/team/jane-doe'
+    assert enriched[1]['Individual profile URLs'] == 'https://firm.example/team/john-smith'
+    assert enriched[0]['Name'] == 'Jane Doe'
+    with open(tmp_path / 'work' / 'batch_input.jsonl', encoding='utf-8') as f:
+        assert [json.loads(line)['custom_id'] for line in f] == ['employee-0', 'employee-1']
+
+
+def test_failed_requests_keep_the_scraped_row(tmp_path):
+    def responder(body):
+        if 'Jane Doe' in body['messages'][-1]['content']:
+            raise RuntimeError("model error")
+        return title_responder(body)
+
+    backend = LocalFileBatchBackend(str(tmp_path / 'backend'), responder=responder)
+
+    enriched = run_bulk_enrichment(employees(), backend, str(tmp_path / 'work'), poll_interval=0)
+
+    assert [employee['Title'] for employee in enriched] == ['', 'Associate', 'Counsel']
+
+
+def test_expired_batch_merges_partial_output(tmp_path):
+    class ExpiredBackend(LocalFileBatchBackend):
+        """Finishes only the first request before the completion window runs out"""
+
+        def _run(self, batch_id, output_path):
+            super()._run(batch_id, output_path)
+            with open(output_path, encoding='utf-8') as f:
+                first = f.readline()
+            with open(output_path, 'w', encoding='utf-8') as f:
+                f.write(first)
+
+        def status(self, batch_id):
+            super().status(batch_id)
+            return 'expired'
+
+    backend = ExpiredBackend(str(tmp_path / 'backend'), responder=title_responder)
+
+    enriched = run_bulk_enrichment(employees(), backend, str(tmp_path / 'work'), poll_interval=0)
+
+    assert [employee['Title'] for employee in enriched] == ['Partner', '', 'Counsel']
+
+
+CONTAINERS_DUMP = """=== CONTAINER #1 - Instance #1 ===
+Home
+About
+Team
+Contact
+
+=== CONTAINER #2 - Instance #1 ===
+## Jane Doe
+Partner
+
+Links:
+- Jane Doe: https://firm.example/team/jane-doe
+
+=== CONTAINER #2 - Instance #2 ===
+## John Smith
+Associate
+
+Links:
+- John Smith: https://firm.example/team/john-smith
+"""
+
+
+def listing_responder(body):
+    """Answer the listing prompt with the card's name and profile link"""
+    card = json.loads(body['messages'][-1]['content'].split('Raw data:\n', 1)[1])
+    name = card['text'].split('\n', 1)[0].lstrip('# ')
+    return json.dumps({"employees": [{"Name": name, "Title": "",
+                                      "Individual profile URLs": card['links'][0]['href']}]})
+
+
+def test_containers_dump_is_ranked_and_extracted(tmp_path):
+    dump = tmp_path / 'containers.txt'
+    dump.write_text(CONTAINERS_DUMP, encoding='utf-8')
+
+    formatted_data = load_containers(str(dump))
+    container_key = select_container(formatted_data)
+    backend = LocalFileBatchBackend(str(tmp_path / 'backend'), responder=listing_responder)
+    employees = extract_listing(formatted_data[container_key], "https://firm.example/team", backend,
+                                str(tmp_path / 'work'), poll_interval=0)
+
+    assert container_key == '2'
+    assert [(employee['Name'], employee['Main_URL']) for employee in employees] == [
+        ('Jane Doe', 'https://firm.example/team'), ('John Smith', 'https://firm.example/team')
+    ]
+
+    backend.responder = title_responder
+    enriched = run_bulk_enrichment(employees, backend, str(tmp_path / 'work'), poll_interval=0)
+
+    assert [employee['Title'] for employee in enriched] == ['Partner', 'Associate']
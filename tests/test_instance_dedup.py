@@ -0,0 +1,69 @@
+from instance_dedup import build_instance_index, map_deduplicated
+
+BIO = "leads the private equity practice and advises sponsors on buyouts, carve-outs and exits across Europe"
+JANE = {'text': f"Jane Doe\nPartner\nJane {BIO}",
+        'links': [{'href': 'https://firm.example/team/jane-doe'}, {'href': 'https://www.linkedin.com/in/jane-doe'}]}
+JOHN = {'text': "John Smith\nAssociate\nJohn works on fund formation, secondaries and co-investments for LPs",
+        'links': [{'href': 'https://firm.example/team/john-smith'}]}
+ANN = {'text': "Ann Lee\nCounsel\nAnn advises investment managers on regulatory matters and fund structuring",
+       'links': [{'href': 'https://firm.example/team/ann-lee'}]}
+
+
+def grid_wrapper(*cards):
+    return {'text': '\n'.join(card['text'] for card in cards),
+            'links': [link for card in cards for link in card['links']]}
+
+
+def test_card_inner_div_and_wrapping_li_cluster_together():
+    inner_div = {'text': f"Jane Doe\nPartner\nJane {BIO}", 'links': [{'href': 'https://firm.example/team/jane-doe/'}]}
+    name_only = {'text': "Jane Doe", 'links': []}
+    wrapping_li = {'text': JANE['text'] + "\nRead more", 'links': JANE['links']}
+    index = build_instance_index({
+        '1': {'1': JANE, '2': JOHN},
+        '2': {'1': inner_div, '2': name_only},
+        '3': {'1': wrapping_li},
+    })
+
+    clusters = sorted(sorted(cluster) for cluster in index.clusters())
+
+    assert clusters == [[('1', '1'), ('2', '1'), ('2', '2'), ('3', '1')], [('1', '2')]]
+
+
+def test_grid_wrapper_is_never_merged_into_a_single_card():
+    for data in ({'1': {'1': JANE, '2': JOHN, '3': ANN}, '2': {'1': grid_wrapper(JANE, JOHN, ANN)}},
+                 {'2': {'1': grid_wrapper(JANE, JOHN, ANN)}, '1': {'1': JANE, '2': JOHN, '3': ANN}}):
+        index = build_instance_index(data)
+
+        assert sorted(sorted(cluster) for cluster in index.clusters()) == [
+            [('1', '1')], [('1', '2')], [('1', '3')], [('2', '1')]
+        ]
+
+
+def test_representative_comes_from_the_selected_container():
+    richer_copy = {'text': JANE['text'] + "\nRead more", 'links': JANE['links']}
+    index = build_instance_index({'1': {'1': JANE}, '2': {'1': richer_copy}})
+
+    assert index.representatives()[('1', '1')] == ('2', '1')
+    assert index.representatives([('1', '1')])[('2', '1')] == ('1', '1')
+
+
+def test_map_deduplicated_calls_once_per_cluster_and_reuses_the_cache():
+    data = {'1': {'1': JANE, '2': JOHN, '3': ANN}, '2': {'1': dict(JANE), '2': dict(JOHN)}}
+    calls = []
+
+    def fn(instance):
+        calls.append(instance['text'].split('\n', 1)[0])
+        return {'employees': [{'Name': calls[-1]}]}
+
+    cache = {}
+    keys = [(container, instance) for container, instances in data.items() for instance in instances]
+    results = map_deduplicated(keys, build_instance_index(data), fn, cache=cache, url="https://firm.example/team")
+
+    assert sorted(calls) == ['Ann Lee', 'Jane Doe', 'John Smith']
+    assert results[('2', '1')] == results[('1', '1')] == {'employees': [{'Name': 'Jane Doe'}]}
+
+    calls.clear()
+    again = map_deduplicated(keys, build_instance_index(data), fn, cache=cache, url="https://firm.example/team")
+
+    assert calls == []
+    assert again == results
@@ -0,0 +1,52 @@
+import pytest
+
+import helper_functions
+from helper_functions import (DOWNLOAD_CHUNK_SIZE, MAX_RESPONSE_BYTES, get_fetch_metrics, make_request,
+                              reset_fetch_metrics)
+from record_replay import ReplayResponse
+
+URL = "https://firm.example/team/jane-doe"
+
+
+@pytest.fixture
+def serve():
+    """Answer make_request with the given body and content type"""
+    previous = helper_functions._http_get
+
+    def install(body, content_type='text/html; charset=utf-8'):
+        def get(url, **kwargs):
+            return ReplayResponse(url, 200, {'Content-Type': content_type}, body)
+        helper_functions.set_http_transport(get)
+
+    reset_fetch_metrics()
+    yield install
+    helper_functions.set_http_transport(previous)
+
+
+def test_body_over_cap_on_chunk_boundary_is_truncated(serve):
+    assert MAX_RESPONSE_BYTES % DOWNLOAD_CHUNK_SIZE == 0
+    serve(b'a' * (3 * 1024 * 1024))
+
+    assert len(make_request(URL)) == MAX_RESPONSE_BYTES
+    assert get_fetch_metrics() == {'fetched': 1, 'bytes_read': MAX_RESPONSE_BYTES, 'truncated': 1}
+
+
+def test_body_over_cap_mid_chunk_is_truncated(serve):
+    serve(b'a' * 1000)
+
+    assert make_request(URL, max_bytes=100) == 'a' * 100
+    assert get_fetch_metrics()['truncated'] == 1
+
+
+def test_body_exactly_at_cap_is_not_truncated(serve):
+    serve(b'a' * MAX_RESPONSE_BYTES)
+
+    assert len(make_request(URL)) == MAX_RESPONSE_BYTES
+    assert 'truncated' not in get_fetch_metrics()
+
+
+def test_disallowed_content_type_is_skipped(serve):
+    serve(b'%PDF-1.7', content_type='application/pdf')
+
+    assert make_request(URL) is None
+    assert get_fetch_metrics() == {'aborted_content_type': 1}
@@ -0,0 +1,43 @@
+from pagination_crawler import merge_instances
+
+
+def card(text, *hrefs):
+    return {'text': text, 'links': [{'href': href} for href in hrefs]}
+
+
+def test_role_first_cards_are_keyed_on_the_name_line():
+    container = {'1': card('Partner\nJane Doe')}
+
+    merged = merge_instances(container, [card('Partner\nJohn Smith'), card('Partner\nAnn Lee')])
+
+    assert [instance['text'] for instance in merged.values()] == ['Partner\nJane Doe', 'Partner\nJohn Smith',
+                                                                   'Partner\nAnn Lee']
+
+
+def test_same_person_on_a_later_page_is_skipped():
+    container = {'1': card('Jane Doe\nPartner', 'https://firm.example/team/jane-doe')}
+
+    merged = merge_instances(container, [
+        card('Jane Doe\nPartner', 'https://www.firm.example/team/jane-doe/'),
+        card('J. Doe', 'https://firm.example/team/jane', 'https://uk.linkedin.com/in/jane-doe'),
+        card('Jane D.\nPartner', 'https://www.linkedin.com/in/jane-doe/en'),
+    ])
+
+    assert list(merged) == ['1', '2']
+    assert merged['2']['text'] == 'J. Doe'
+
+
+def test_shared_name_with_contradicting_links_is_kept():
+    container = {'1': card('John Smith\nPartner', 'https://firm.example/team/john-smith')}
+
+    merged = merge_instances(container, [card('John Smith\nAssociate', 'https://firm.example/team/john-smith-2')])
+
+    assert len(merged) == 2
+
+
+def test_empty_instances_are_skipped_and_numbering_continues():
+    container = {'1': card('Jane Doe'), '7': card('John Smith')}
+
+    merged = merge_instances(container, [card(''), card('Ann Lee')])
+
+    assert list(merged) == ['1', '7', '8']
@@ -0,0 +1,88 @@
+import os
+
+import pytest
+
+from result_store import ResultStore
+
+FIRM = "https://firm.example/team"
+OTHER_FIRM = "https://other.example/people"
+
+
+@pytest.fixture(autouse=True)
+def temporary_stores(monkeypatch):
+    monkeypatch.delenv("FM_RESULT_STORE_PATH", raising=False)
+
+
+@pytest.fixture
+def store():
+    store = ResultStore()
+    yield store
+    store.close()
+
+
+def test_dedupe_keeps_the_latest_row_per_person(store):
+    store.append_many([
+        {'Name': 'Jane Doe', 'Title': 'Associate', 'LinkedIn Profile Link': 'https://uk.linkedin.com/in/jane-doe/'},
+        {'Name': 'John Smith', 'Individual profile URLs': 'https://firm.example/team/john-smith'},
+    ], FIRM)
+    store.append_many([
+        {'Name': 'Jane Doe', 'Title': 'Partner', 'LinkedIn Profile Link': 'https://www.linkedin.com/in/jane-doe'},
+        {'Name': 'John Smith', 'Individual profile URLs': 'http://www.firm.example/team/john-smith/'},
+    ], OTHER_FIRM)
+
+    assert store.count() == 4
+    assert store.count(dedupe=True) == 2
+    rows = store.page(dedupe=True)
+    assert [row['Title'] for row in rows if row['Name'] == 'Jane Doe'] == ['Partner']
+    assert sorted(store.duplicates()) == ['linkedin:linkedin.com/in/jane-doe', 'profile:firm.example/team/john-smith']
+
+
+def test_iter_pages_walks_every_row_once_in_order(store):
+    store.append_many([{'Name': f'Person {i}'} for i in range(25)], FIRM)
+    store.append_many([{'Name': f'Other {i}'} for i in range(5)], OTHER_FIRM)
+
+    pages = list(store.iter_pages(page_size=7, firm_url=FIRM))
+
+    assert [len(page) for page in pages] == [7, 7, 7, 4]
+    assert [row['Name'] for page in pages for row in page] == [f'Person {i}' for i in range(25)]
+    assert sum(len(page) for page in store.iter_pages(page_size=7)) == 30
+
+
+def test_iter_values_aligns_rows_to_columns(store):
+    store.append_many([{'Name': 'Jane Doe'}, {'Name': 'John Smith', 'Title': 'Partner', 'Bio': None}], FIRM)
+
+    assert store.columns() == ['Name', 'Title', 'Bio']
+    assert list(store.iter_values(page_size=10)) == [[['Jane Doe', '', ''], ['John Smith', 'Partner', '']]]
+
+
+def test_clear_firm_keeps_other_firms(store):
+    store.append_many([{'Name': 'Jane Doe'}, {'Name': 'John Smith'}], FIRM)
+    store.append({'Name': 'Ann Lee'}, OTHER_FIRM)
+
+    store.clear(firm_url=FIRM)
+
+    assert store.count(firm_url=FIRM) == 0
+    assert [row['Name'] for row in store.iter_rows()] == ['Ann Lee']
+    assert store.firms() == [OTHER_FIRM]
+
+
+def test_temporary_store_is_deleted_on_close():
+    store = ResultStore()
+    store.append({'Name': 'Jane Doe'}, FIRM)
+    path = store.path
+    store.close()
+
+    assert not any(os.path.exists(path + suffix) for suffix in ('', '-wal', '-shm'))
+
+
+def test_named_store_is_kept_on_close(tmp_path):
+    path = str(tmp_path / 'results.sqlite3')
+    store = ResultStore(path)
+    store.append({'Name': 'Jane Doe'}, FIRM)
+    store.close()
+
+    reopened = ResultStore(path)
+    try:
+        assert reopened.count() == 1
+    finally:
+        reopened.close()
@@ -0,0 +1,61 @@
+import gzip
+
+import pytest
+
+import helper_functions
+import sitemap_discovery
+from adaptive_concurrency import ConcurrencyController
+from record_replay import ReplayResponse
+
+SITEMAP = (b'<?xml version="1.0" encoding="UTF-8"?>'
+           b'<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">'
+           b'<url><loc>https://firm.example/team/jane-doe</loc></url>'
+           b'<url><loc>https://firm.example/team/john-smith</loc></url>'
+           b'</urlset>')
+
+
+@pytest.fixture
+def serve(monkeypatch):
+    """Serve sitemap bodies by URL through make_request's transport, with a fresh host limiter"""
+    controller = ConcurrencyController(initial_limit=4)
+    monkeypatch.setattr(helper_functions, 'host_concurrency', controller)
+    bodies = {}
+
+    def get(url, **kwargs):
+        if url not in bodies:
+            return ReplayResponse(url, 404, {}, b'')
+        return ReplayResponse(url, 200, {'Content-Type': 'application/xml'}, bodies[url])
+
+    previous = helper_functions.set_http_transport(get)
+    yield bodies, controller
+    helper_functions.set_http_transport(previous)
+
+
+def test_sitemap_is_fetched_through_the_transport_and_host_limiter(serve):
+    bodies, controller = serve
+    bodies['https://firm.example/sitemap.xml'] = SITEMAP
+
+    entries = list(sitemap_discovery.iter_sitemap_entries('https://firm.example/sitemap.xml'))
+
+    assert entries == [('url', 'https://firm.example/team/jane-doe'), ('url', 'https://firm.example/team/john-smith')]
+    assert controller.metrics()['firm.example']['outcomes'] == {'ok': 1}
+
+
+def test_gzipped_sitemap_is_decompressed(serve):
+    bodies, _ = serve
+    bodies['https://firm.example/sitemap.xml.gz'] = gzip.compress(SITEMAP)
+
+    assert len(list(sitemap_discovery.iter_sitemap_entries('https://firm.example/sitemap.xml.gz'))) == 2
+
+
+def test_decompressed_size_is_limited(serve, monkeypatch):
+    bodies, _ = serve
+    monkeypatch.setattr(sitemap_discovery, 'MAX_SITEMAP_BYTES', 64 * 1024)
+    url_entry = b'<url><loc>https://firm.example/team/person</loc></url>'
+    bomb = gzip.compress(b'<urlset>' + url_entry * 100000 + b'</urlset>')
+    assert len(bomb) < sitemap_discovery.MAX_SITEMAP_BYTES
+    bodies['https://firm.example/sitemap.xml.gz'] = bomb
+
+    entries = list(sitemap_discovery.iter_sitemap_entries('https://firm.example/sitemap.xml.gz'))
+
+    assert len(entries) * len(url_entry) <= sitemap_discovery.MAX_SITEMAP_BYTES
@@ -0,0 +1,88 @@
+import pytest
+
+from url_canonical import canonicalize_url, host_key, is_linkedin_url, site_root, url_key
+
+TEAM = "https://www.firm.com/team"
+
+
+@pytest.mark.parametrize("url, expected", [
+    ("https://www.linkedin.com/in/jane-doe", "https://www.linkedin.com/in/jane-doe"),
+    ("https://linkedin.com/in/jane-doe/", "https://www.linkedin.com/in/jane-doe"),
+    ("http://uk.linkedin.com/in/Jane-Doe/?trk=public_profile", "https://www.linkedin.com/in/jane-doe"),
+    ("https://m.linkedin.com/in/jane-doe/en", "https://www.linkedin.com/in/jane-doe"),
+    ("https://fr.linkedin.com/in/jane-doe?originalSubdomain=fr#about", "https://www.linkedin.com/in/jane-doe"),
+    ("https://www.linkedin.com/in/jane-doe/details/experience/", "https://www.linkedin.com/in/jane-doe"),
+    ("https://www.linkedin.com/company/firm-capital/about/", "https://www.linkedin.com/company/firm-capital"),
+    ("linkedin.com/in/jane-doe", "https://www.linkedin.com/in/jane-doe"),
+])
+def test_linkedin_variants_collapse(url, expected):
+    assert canonicalize_url(url) == expected
+    assert is_linkedin_url(url)
+
+
+@pytest.mark.parametrize("url, expected", [
+    ("https://firm.com/team/jane?utm_source=linkedin&utm_medium=social", "https://firm.com/team/jane"),
+    ("https://firm.com/team/jane?page=2&gclid=abc&fbclid=def", "https://firm.com/team/jane?page=2"),
+    ("https://firm.com/team/jane?_hsenc=x&id=7&mc_cid=y", "https://firm.com/team/jane?id=7"),
+    ("https://firm.com/team/jane?ref=team&si=abc", "https://firm.com/team/jane?ref=team&si=abc"),
+    ("https://firm.com/team/jane?UTM_Campaign=x", "https://firm.com/team/jane"),
+])
+def test_tracking_parameters_are_stripped(url, expected):
+    assert canonicalize_url(url) == expected
+
+
+@pytest.mark.parametrize("url, expected", [
+    ("HTTPS://WWW.Firm.COM/Team/Jane", "https://www.firm.com/Team/Jane"),
+    ("https://firm.com:443/team", "https://firm.com/team"),
+    ("http://firm.com:80/team", "http://firm.com/team"),
+    ("https://firm.com:8443/team", "https://firm.com:8443/team"),
+    ("https://firm.com/team/jane#bio", "https://firm.com/team/jane"),
+    ("https://firm.com", "https://firm.com/"),
+    ("https://firm.com/team/", "https://firm.com/team/"),
+    ("  https://firm.com/team  ", "https://firm.com/team"),
+])
+def test_scheme_host_port_and_fragment(url, expected):
+    assert canonicalize_url(url) == expected
+
+
+@pytest.mark.parametrize("url, base_url, resolve_relative, expected", [
+    ("/team/jane", TEAM, True, "https://www.firm.com/team/jane"),
+    ("jane", "https://www.firm.com/team/", True, "https://www.firm.com/team/jane"),
+    ("../people/jane", "https://www.firm.com/team/list", True, "https://www.firm.com/people/jane"),
+    ("//cdn.firm.com/jane.jpg", TEAM, True, "https://cdn.firm.com/jane.jpg"),
+    ("www.firm.com/team/jane", TEAM, True, "https://www.firm.com/team/jane"),
+    ("linkedin.com/in/jane-doe", "https://firm.com/team", True, "https://www.linkedin.com/in/jane-doe"),
+    ("firm.com/team/jane", "https://firm.com/team", False, "https://firm.com/team/jane"),
+    ("firm.co.uk/people/jane", "https://firm.co.uk/people", False, "https://firm.co.uk/people/jane"),
+    ("jane.html", "https://firm.com/team/", False, "https://firm.com/team/jane.html"),
+    ("/team/jane", "https://firm.com/team", False, "https://firm.com/team/jane"),
+    ("firm.com/team/jane", "", True, "https://firm.com/team/jane"),
+    ("mailto:jane@firm.com", TEAM, True, "mailto:jane@firm.com"),
+    ("tel:+441234", TEAM, True, "tel:+441234"),
+    ("jane", "", True, "jane"),
+    ("", TEAM, True, ""),
+])
+def test_relative_and_scheme_less_inputs(url, base_url, resolve_relative, expected):
+    assert canonicalize_url(url, base_url, resolve_relative=resolve_relative) == expected
+
+
+@pytest.mark.parametrize("variants", [
+    ("https://www.firm.com/team/jane", "http://firm.com/team/jane/", "HTTPS://FIRM.COM/team/jane#bio",
+     "https://www.firm.com/team/jane?utm_source=x", "www.firm.com/team/jane"),
+    ("https://uk.linkedin.com/in/jane-doe/", "linkedin.com/in/Jane-Doe", "https://www.linkedin.com/in/jane-doe/en"),
+    ("https://firm.com/team?page=2", "https://www.firm.com/team/?page=2&gclid=1"),
+])
+def test_url_key_matches_variants_of_one_target(variants):
+    assert len({url_key(url) for url in variants}) == 1
+
+
+def test_url_key_keeps_distinct_targets_apart():
+    assert url_key("https://firm.com/team/jane") != url_key("https://firm.com/team/john")
+    assert url_key("https://firm.com/team?page=2") != url_key("https://firm.com/team?page=3")
+    assert url_key("https://firm.com/team/jane") == "firm.com/team/jane"
+
+
+def test_site_root_and_host_key():
+    assert site_root("https://www.firm.com/team/jane?x=1") == "https://www.firm.com"
+    assert host_key("http://WWW.Firm.com:80/team") == "firm.com"
+    assert host_key("https://firm.com:8443/team") == "firm.com:8443"
@@ -0,0 +1,161 @@
+import re
+from functools import lru_cache
+from urllib.parse import urljoin, urlsplit, urlunsplit
+
+URL_CACHE_SIZE = 65536
+
+# Query parameters that only track the visit and never change the page. Generic
+# names such as 'ref' or 'si' are left alone since some sites route on them.
+TRACKING_PARAMS = frozenset({
+    'gclid', 'dclid', 'gbraid', 'wbraid', 'fbclid', 'msclkid', 'yclid', 'twclid', 'igshid', 'mc_cid', 'mc_eid',
+    '_ga', '_gl', '_hsenc', '_hsmi', 'mkt_tok', 'ref_src', 'trk', 'trkinfo', 'lipi', 'licu',
+    'originalsubdomain', 'original_referer',
+})
+TRACKING_PREFIXES = ('utm_', 'hsa_', 'pk_', 'mtm_')
+
+DEFAULT_PORTS = {'http': 80, 'https': 443}
+LINKEDIN_HOST = 'www.linkedin.com'
+# LinkedIn paths identified by their first two segments, e.g. /in/<vanity-name>
+LINKEDIN_ENTITY_PREFIXES = ('in', 'company', 'school', 'showcase')
+
+# Top-level domains taken to mark a scheme-less 'host/path' value, e.g. 'firm.com/team/jane'
+KNOWN_TLDS = frozenset({
+    'com', 'org', 'net', 'edu', 'gov', 'int', 'io', 'co', 'ai', 'biz', 'info', 'eu', 'uk', 'de', 'fr', 'nl', 'be',
+    'lu', 'ch', 'at', 'it', 'es', 'pt', 'ie', 'se', 'no', 'dk', 'fi', 'is', 'pl', 'cz', 'gr', 'us', 'ca', 'mx', 'br',
+    'au', 'nz', 'jp', 'cn', 'hk', 'sg', 'in', 'ae', 'il', 'za', 'kr', 'tw', 'partners', 'capital', 'law', 'legal',
+    'finance', 'fund', 'ventures', 'group', 'global',
+})
+
+_SCHEME_RE = re.compile(r'^[a-zA-Z][a-zA-Z0-9+.-]*:')
+_HOST_RE = re.compile(r'^(?:[a-z0-9](?:[a-z0-9-]*[a-z0-9])?\.)+([a-z]{2,})(?::\d+)?$')
+
+
+def _is_host_shaped(segment: str, known_tlds: bool) -> bool:
+    """Whether the first segment of a scheme-less value names a host rather than a path"""
+    segment = segment.lower()
+    match = _HOST_RE.match(segment)
+    if not match:
+        return False
+    host = segment.split(':', 1)[0]
+    if host.startswith('www.') or host == 'linkedin.com' or host.endswith('.linkedin.com'):
+        return True
+    return known_tlds and match.group(1) in KNOWN_TLDS
+
+
+def _strip_tracking(query: str) -> str:
+    if not query:
+        return ''
+    kept = []
+    for param in query.split('&'):
+        if not param:
+            continue
+        key = param.split('=', 1)[0].lower()
+        if key in TRACKING_PARAMS or key.startswith(TRACKING_PREFIXES):
+            continue
+        kept.append(param)
+    return '&'.join(kept)
+
+
+def _linkedin_path(path: str) -> str:
+    segments = [segment for segment in path.split('/') if segment]
+    if len(segments) >= 2 and segments[0].lower() in LINKEDIN_ENTITY_PREFIXES:
+        # Drops locale suffixes and sub-pages like /in/jane-doe/en or /in/jane-doe/details/experience
+        segments = segments[:2]
+    return '/' + '/'.join(segments).lower()
+
+
+@lru_cache(maxsize=URL_CACHE_SIZE)
+def canonicalize_url(url: str, base_url: str = "", resolve_relative: bool = True) -> str:
+    """Absolute, fetchable canonical form of a link.
+
+    Relative links are resolved against base_url and scheme-less hosts get https.
+    'www.' and LinkedIn hosts are always taken as hosts. With resolve_relative
+    False, for values that are not HTML hrefs such as LLM output, any first
+    segment ending in a known TLD ('firm.com/team/jane') is too, rather than
+    being joined to base_url as a path.
+    The scheme and host are lowercased, default ports, fragments and tracking
+    parameters are removed, and LinkedIn profile and company links collapse to
+    https://www.linkedin.com/in/<name>. Paths otherwise keep their case and
+    trailing slash. Non-HTTP links (mailto:, tel:) and unparseable input come
+    back stripped but otherwise unchanged.
+    """
+    url = url.strip()
+    if not url:
+        return ''
+    if not url[:8].lower().startswith(('http://', 'https://')):
+        if _SCHEME_RE.match(url):
+            return url
+        if url.startswith('//'):
+            url = 'https:' + url
+        elif _is_host_shaped(url.split('/', 1)[0], known_tlds=not resolve_relative):
+            url = 'https://' + url
+        elif base_url:
+            url = urljoin(canonicalize_url(base_url), url)
+        elif '.' in url.split('/', 1)[0]:
+            url = 'https://' + url
+        else:
+            return url
+
+    try:
+        parts = urlsplit(url)
+        host = parts.hostname or ''
+        port = parts.port
+    except ValueError:
+        return url
+    scheme = parts.scheme.lower()
+    if not host or scheme not in DEFAULT_PORTS:
+        return url
+
+    if host == 'linkedin.com' or host.endswith('.linkedin.com'):
+        return urlunsplit(('https', LINKEDIN_HOST, _linkedin_path(parts.path), '', ''))
+
+    netloc = host if port is None or port == DEFAULT_PORTS[scheme] else f"{host}:{port}"
+    return urlunsplit((scheme, netloc, parts.path or '/', _strip_tracking(parts.query), ''))
+
+
+@lru_cache(maxsize=URL_CACHE_SIZE)
+def url_key(url: str, base_url: str = "") -> str:
+    """Identity of a link for caches and duplicate detection.
+
+    Built from the canonical form with the scheme, a leading 'www.' and any
+    trailing slash dropped, lowercased.
+    """
+    canonical = canonicalize_url(url, base_url)
+    scheme, separator, rest = canonical.partition('://')
+    if not separator:
+        return canonical.lower()
+    rest = rest.lower().replace('/?', '?')
+    if rest.startswith('www.'):
+        rest = rest[4:]
+    return rest.rstrip('/')
+
+
+@lru_cache(maxsize=URL_CACHE_SIZE)
+def site_root(url: str) -> str:
+    """scheme://host of a URL, e.g. 'https://www.domain.com'"""
+    canonical = canonicalize_url(url)
+    scheme, separator, rest = canonical.partition('://')
+    if not separator:
+        return canonical
+    return f"{scheme}://{rest.split('/', 1)[0]}"
+
+
+@lru_cache(maxsize=URL_CACHE_SIZE)
+def host_key(url: str) -> str:
+    """Lowercased host without 'www.', used to group URLs by site"""
+    return url_key(site_root(url)).split('/', 1)[0]
+
+
+def is_linkedin_url(url: str) -> bool:
+    return canonicalize_url(url).startswith(f'https://{LINKEDIN_HOST}/')
+
+
+def cache_info() -> dict:
+    """Hit and miss counts of the memoized functions"""
+    return {function.__name__: function.cache_info()._asdict()
+            for function in (canonicalize_url, url_key, site_root, host_key)}
+
+
+def clear_caches() -> None:
+    for function in (canonicalize_url, url_key, site_root, host_key):
+        function.cache_clear()